@@ -0,0 +1,132 @@
+#
+# bench_parsers.py
+# Micro-benchmark of ERRORS/USAGES response parsing
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Compare regex based response parsing with ResponseParser."""
+
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import linter  # noqa
+
+# Regular expressions used before ResponseParser was introduced.
+reErrors = re.compile(
+    r'((.*)(\r?\n))*^ERRORS \"(?P<filename>.+)\"\s(?P<id>\d+)\r?\n'
+    r'(?P<allerrors>((.*)\r?\n)+)'
+    r'^ERRORS-END(\r?\n)?',
+    re.MULTILINE)
+
+reErrorWithOffsets = re.compile(
+    r'(?P<type>(ERROR|WARN|INFO)) '
+    r'(?P<fromOfs>\d+) (?P<toOfs>\d+) (?P<message>.+)\r?\n')
+
+reUsages = re.compile(
+    r'((.*)(\r?\n))*^USAGES (?P<type>.+) \"(?P<name>.*)\" \"(?P<arg>.+)\"\r?\n'
+    r'(?P<allusages>((.+)\r?\n)+)'
+    r'^USAGES-END(\r?\n)?',
+    re.MULTILINE)
+
+reUsage = re.compile(
+    r'^(?P<type>.+) '
+    r'\"(?P<filename>.+)\" '
+    r'\"(?P<filename1>.+)\" '
+    r'(?P<somenum>\d+) '
+    r'(?P<fromOfs>\d+) (?P<toOfs>\d+) '
+    r'\"(?P<quote>(?:[^"\\]|\\.)*)\" '
+    r'.*\r?\n',
+    re.MULTILINE)
+
+
+def errorsResponse(count):
+    """ Build ERRORS response with count records."""
+    lines = ['ERRORS "/src/module.cpp" 1']
+    for i in range(count):
+        lines.append("%s %d %d unused variable 'x%d'" % (
+            "ERROR" if i % 7 == 0 else "WARN", i * 10, i * 10 + 4, i))
+    lines.append("ERRORS-END")
+    return lines
+
+
+def usagesResponse(count):
+    """ Build USAGES response to find-names with count records."""
+    lines = ['USAGES names "" "system"']
+    for i in range(count):
+        lines.append('function "/src/m%d.cpp" "/src/m%d.cpp" 1 %d %d '
+                     '"int name%d(char *s = \\"x\\")" 0' % (
+                         i % 50, i % 50, i * 10, i * 10 + 6, i))
+    lines.append("USAGES-END")
+    return lines
+
+
+def parseErrorsWithRegex(lines):
+    """ Parse ERRORS the way ErrorsHandler used to."""
+    match = reErrors.match("\n".join(lines) + "\n")
+    return [(m.group('type'), int(m.group('fromOfs')), int(m.group('toOfs')),
+             m.group('message'))
+            for m in reErrorWithOffsets.finditer(match.group('allerrors'))]
+
+
+def parseUsagesWithRegex(lines):
+    """ Parse USAGES the way UsagesNamesHandler used to."""
+    match = reUsages.match("\n".join(lines) + "\n")
+    return [(m.group('type'), m.group('filename'), int(m.group('fromOfs')),
+             int(m.group('toOfs')), m.group('quote'))
+            for m in reUsage.finditer(match.group('allusages'))]
+
+
+def parseErrorsWithParser(lines):
+    """ Parse ERRORS with ErrorsParser."""
+    parser = linter.ErrorsParser()
+    parser.parse(lines)
+    return [tuple(r) for r in parser.records]
+
+
+def parseUsagesWithParser(lines):
+    """ Parse USAGES with parser of UsagesNamesHandler."""
+    parser = linter.UsagesNamesHandler().parser()
+    parser.parse(lines)
+    return [tuple(r) for r in parser.records]
+
+
+def measure(name, parse, lines, repeat):
+    """ Report lines/sec of parse over lines."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = parse(lines)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-24s %8d lines %12.0f lines/sec" % (
+        name, len(lines), len(lines) / best))
+    return result
+
+
+def main():
+    """ Run benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = 3
+
+    errors = errorsResponse(count)
+    before = measure("ERRORS regex", parseErrorsWithRegex, errors, repeat)
+    after = measure("ERRORS parser", parseErrorsWithParser, errors, repeat)
+    assert before == after
+
+    usages = usagesResponse(count)
+    before = measure("USAGES regex", parseUsagesWithRegex, usages, repeat)
+    after = measure("USAGES parser", parseUsagesWithParser, usages, repeat)
+    assert before == after
+
+
+if __name__ == "__main__":
+    main()
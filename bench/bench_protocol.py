@@ -0,0 +1,209 @@
+#
+# bench_protocol.py
+# Throughput and latency benchmark of Cfserver client
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Drive OutputCollector, Daemon and handlers against fake Cfserver.
+
+Reports bytes/sec of framing and parsing, latency percentiles of
+requests answered by fake_cfserver.py and peak memory. Runs without
+Sublime Text, using stub sublime module from stubs directory.
+
+    python3 bench/bench_protocol.py --errors 5000 --requests 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import tracemalloc
+except ImportError:  # Python 3.3
+    tracemalloc = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import sublime  # noqa
+import linter  # noqa
+
+
+def percentile(values, p):
+    """ Compute p-th percentile of values."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    ndx = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[ndx]
+
+
+def reportLatency(name, latencies):
+    """ Print latency percentiles in milliseconds."""
+    print("%-24s %6d samples   p50 %8.2f ms  p90 %8.2f ms  p99 %8.2f ms  max %8.2f ms" % (
+        name, len(latencies),
+        percentile(latencies, 50) * 1000, percentile(latencies, 90) * 1000,
+        percentile(latencies, 99) * 1000, max(latencies or [0]) * 1000))
+
+
+def reportThroughput(name, size, elapsed):
+    """ Print bytes/sec."""
+    print("%-24s %10d bytes %12.0f bytes/sec" % (name, size, size / elapsed))
+
+
+def configureFake(args):
+    """ Pass reply sizes to fake Cfserver through environment."""
+    os.environ["FAKE_CFSERVER_ERRORS"] = str(args.errors)
+    os.environ["FAKE_CFSERVER_USAGES"] = str(args.usages)
+    os.environ["FAKE_CFSERVER_NAMES"] = str(args.names)
+    os.environ["FAKE_CFSERVER_DELAY"] = str(args.delay)
+    os.environ["FAKE_CFSERVER_RATE"] = str(args.rate)
+
+
+def benchParsing(args):
+    """ Frame and parse synthetic replies in process."""
+    configureFake(args)
+    sys.path.insert(0, HERE)
+    import fake_cfserver
+
+    replies = []
+    for i in range(args.requests):
+        replies += fake_cfserver.errorsReply("/bench/module%d.cpp" % i, i)
+    replies += fake_cfserver.namesReply("find-names", "system")
+    data = ("\n".join(replies) + "\n").encode("utf-8")
+
+    started = time.perf_counter()
+    records = frameAndParse(data)
+    elapsed = time.perf_counter() - started
+    reportThroughput("frame + parse", len(data), elapsed)
+    print("%-24s %10d records" % ("", records))
+    if tracemalloc is not None:
+        tracemalloc.start()
+        frameAndParse(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("%-24s %10.1f MB" % ("peak traced memory", peak / 1048576.0))
+
+
+def frameAndParse(data):
+    """ Feed data through ResponseFramer and parsers, count records."""
+    parsers = {
+        "ERRORS": linter.ErrorsParser,
+        "USAGES": linter.UsagesNamesHandler().parser,
+    }
+    framer = linter.ResponseFramer()
+    size = linter.OutputCollector.BUF_SIZE
+    records = 0
+    for offset in range(0, len(data), size):
+        framer.feed(data[offset:offset + size])
+        for lines in framer.responses():
+            create = parsers.get(linter.OutputCollector.firstWord(lines[0]))
+            if create is not None:
+                parser = create()
+                parser.parse(lines)
+                records += len(parser.records)
+    return records
+
+
+def openView(filename):
+    """ Open stub view for file."""
+    view = sublime.View(sublime.window, filename, "x" * 65536)
+    sublime.window.openViews.append(view)
+    return view
+
+
+def benchDaemon(args):
+    """ Measure request latencies against fake Cfserver process."""
+    configureFake(args)
+    sublime.settings.set("cfserver_path", os.path.join(HERE, "fake_cfserver.py"))
+    sublime.settings.set("cfserver_inlog", "")
+    sublime.settings.set("cfserver_outlog", "")
+
+    view = openView("/bench/module.cpp")
+    daemon = linter.Cfserver.getDaemon(view)
+    linter.Cfserver.registerFileIfNotLoaded(daemon, view.file_name())
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(args.requests):
+        id = daemon.getNextUniqueId()
+        sent = time.perf_counter()
+        request = daemon.request(
+            'analyze -n %d "%s" 0 end' % (id, view.file_name()), "ERRORS",
+            id=id)
+        request.wait(args.timeout)
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - started
+    reportLatency("analyze", latencies)
+    print("%-24s %10.0f requests/sec" % ("", args.requests / elapsed))
+
+    latencies = []
+    for i in range(args.requests):
+        handler = linter.UsagesHandler()
+        sent = time.perf_counter()
+        handled = []
+        request = daemon.request(
+            'find-usages "%s" %d' % (view.file_name(), i), "USAGES",
+            lambda lines: handled.append(handler.proc(lines)))
+        request.wait(args.timeout)
+        latencies.append(time.perf_counter() - sent)
+    reportLatency("find-usages", latencies)
+
+    latencies = []
+    for i in range(max(1, args.requests // 20)):
+        handler = linter.UsagesNamesHandler()
+        sent = time.perf_counter()
+        request = daemon.request(
+            'find-names "" "system"', "USAGES", handler.proc)
+        request.wait(args.timeout)
+        latencies.append(time.perf_counter() - sent)
+    reportLatency("find-names", latencies)
+
+    linter.Cfserver.daemons.stopAll()
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print("%-24s %10.1f MB" % ("peak resident memory", peak / 1024.0))
+
+
+def main():
+    """ Run benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--errors", type=int, default=1000,
+                        help="records in every ERRORS reply")
+    parser.add_argument("--usages", type=int, default=20,
+                        help="records in every find-usages reply")
+    parser.add_argument("--names", type=int, default=20000,
+                        help="records in every find-names reply")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="number of requests of every kind")
+    parser.add_argument("--delay", type=int, default=0,
+                        help="milliseconds fake Cfserver thinks before replying")
+    parser.add_argument("--rate", type=int, default=0,
+                        help="bytes/sec fake Cfserver writes at, 0 for unlimited")
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="seconds to wait for every reply")
+    parser.add_argument("--parse-only", action="store_true",
+                        help="skip benchmark against fake Cfserver process")
+    parser.add_argument("--verbose", action="store_true",
+                        help="keep plugin console output")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        linter.print = lambda *args, **kwargs: None
+
+    benchParsing(args)
+    if not args.parse_only:
+        benchDaemon(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+#
+# fake_cfserver.py
+# Stand-in for Cfserver executable speaking the same line protocol
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Fake Cfserver replying to commands with synthetic responses.
+
+Size and pace of replies are taken from environment, so that it can be
+started by Daemon the same way real Cfserver is:
+
+    FAKE_CFSERVER_ERRORS   number of records in ERRORS reply (100)
+    FAKE_CFSERVER_USAGES   number of records in USAGES reply (20)
+    FAKE_CFSERVER_NAMES    number of records in find-names reply (1000)
+    FAKE_CFSERVER_DELAY    milliseconds to think before replying (0)
+    FAKE_CFSERVER_RATE     bytes per second to write replies at (unlimited)
+    FAKE_CFSERVER_SCRIPT   file with canned replies
+
+Script file consists of sections, each starting with "@@ <command>"
+line followed by lines of reply to that command. "{file}" and "{id}"
+in reply are replaced with file name and id of the request.
+"""
+
+import os
+import re
+import sys
+import time
+
+
+def setting(name, default):
+    """ Read integer setting from environment."""
+    return int(os.environ.get("FAKE_CFSERVER_" + name, default))
+
+
+ERRORS = setting("ERRORS", 100)
+USAGES = setting("USAGES", 20)
+NAMES = setting("NAMES", 1000)
+DELAY = setting("DELAY", 0) / 1000.0
+RATE = setting("RATE", 0)
+
+reFields = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def loadScript(path):
+    """ Read canned replies keyed by command."""
+    script = {}
+    if path:
+        with open(path) as f:
+            command = None
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line.startswith("@@ "):
+                    command = line[3:].strip()
+                    script[command] = []
+                elif command is not None:
+                    script[command].append(line)
+    return script
+
+
+SCRIPT = loadScript(os.environ.get("FAKE_CFSERVER_SCRIPT"))
+
+
+def errorsReply(filename, id):
+    """ Build reply to analyze command."""
+    lines = ['PROGRESS-START "Analyzing %s"' % (filename),
+             'PROGRESS-START-END',
+             'ERRORS-CLEAR',
+             'ERRORS-CLEAR-END',
+             'ERRORS "%s" %s' % (filename, id)]
+    for i in range(ERRORS):
+        lines.append("%s %d %d %s number %d" % (
+            "ERROR" if i % 5 == 0 else "WARN", i * 40, i * 40 + 8,
+            "unused variable" if i % 2 else "implicit conversion", i))
+    lines += ['ERRORS-END', 'PROGRESS-END', 'PROGRESS-END-END']
+    return lines
+
+
+def usagesReply(command, filename):
+    """ Build reply to context find command."""
+    lines = ['USAGES %s "symbol%d"' % (command, len(filename))]
+    for i in range(USAGES):
+        lines.append('USE "%s" %d %d "  int symbol = call(\\"%d\\");" 0' % (
+            filename, i * 100, i * 100 + 6, i))
+    lines.append('USAGES-END')
+    return lines
+
+
+def namesReply(command, arg):
+    """ Build reply to global find command."""
+    lines = ['USAGES %s "" "%s"' % (command, arg or "system")]
+    for i in range(NAMES):
+        filename = "/src/module%d.cpp" % (i % 97)
+        if command == "find-files":
+            lines.append('file "%s" 0 0 "" 1 2 3 "module%d.cpp" 4 5 no' % (
+                filename, i % 97))
+        elif command == "find-strings":
+            lines.append('string "%s" %d %d "text %d" 1 2 3 "%s" 4 5 no' % (
+                filename, i * 10, i * 10 + 8, i, filename))
+        else:
+            lines.append('function "%s" "%s" 1 %d %d "void name%d()" 0' % (
+                filename, filename, i * 10, i * 10 + 6, i))
+    lines.append('USAGES-END')
+    return lines
+
+
+def write(lines):
+    """ Write reply at configured rate."""
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    out = sys.stdout.buffer
+    if RATE <= 0:
+        out.write(data)
+    else:
+        chunk = max(1, RATE // 100)
+        for i in range(0, len(data), chunk):
+            out.write(data[i:i + chunk])
+            out.flush()
+            time.sleep(chunk / float(RATE))
+    out.flush()
+
+
+def reply(line):
+    """ Build reply to one command, None if command has no reply."""
+    words = line.split(" ", 1)
+    command = words[0]
+    fields = [quoted if bare == "" else bare
+              for quoted, bare in reFields.findall(words[1] if len(words) > 1 else "")]
+    if command == "analyze" and len(fields) >= 3:
+        (id, filename) = (fields[1], fields[2])
+    else:
+        (id, filename) = ("0", fields[0] if fields else "")
+    if command in SCRIPT:
+        return [scripted.replace("{file}", filename).replace("{id}", id)
+                for scripted in SCRIPT[command]]
+    if command == "analyze":
+        return errorsReply(filename, id)
+    if command in ("goto-def", "find-usages", "find-declarators",
+                   "find-parents", "find-inheritors"):
+        return usagesReply(command, filename)
+    if command.startswith("find-"):
+        return namesReply(command, fields[1] if len(fields) > 1 else "")
+    return None
+
+
+def main():
+    """ Serve commands from stdin until it is closed."""
+    for line in sys.stdin:
+        line = line.strip()
+        if line == "exit":
+            break
+        lines = reply(line)
+        if lines is not None:
+            if DELAY:
+                time.sleep(DELAY)
+            write(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#
+# replay.py
+# Replay of recorded Cfserver session through plugin handlers
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Replay protocol recording and report how long replies took to handle.
+
+Recording is made by setting "protocol_recording" to a file name in
+Cfserver settings. Replay runs without Sublime Text, using stub sublime
+module, and by default goes as fast as possible:
+
+    python3 bench/replay.py session.rec [--speed 1]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import sublime  # noqa
+import linter  # noqa
+from bench_protocol import percentile, reportLatency  # noqa
+
+
+def openViews(replayer):
+    """ Open stub views for files errors were reported for."""
+    for (kind, at, id, payload) in replayer.events:
+        if kind == "R" and linter.OutputCollector.firstWord(payload[0]) == "ERRORS":
+            header = linter.ErrorsParser().parseHeader(payload[0])
+            if header is not None and sublime.window.find_open_file(header[0]) is None:
+                sublime.window.openViews.append(
+                    sublime.View(sublime.window, header[0], "x" * 65536))
+
+
+def main():
+    """ Replay recording."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="file written by ProtocolRecorder")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="1 for recorded pace, 0 for as fast as possible")
+    parser.add_argument("--slowest", type=int, default=10,
+                        help="number of slowest replies to list")
+    parser.add_argument("--verbose", action="store_true",
+                        help="keep plugin console output")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        linter.print = lambda *args, **kwargs: None
+
+    replayer = linter.ProtocolReplayer(args.recording)
+    openViews(replayer)
+    outputCollector = linter.OutputCollector(None, linter.RequestRouter())
+    outputCollector.addHandler(linter.ErrorsHandler())
+    outputCollector.addHandler(
+        linter.Handler("ERRORS-CLEAR", lambda lines:
+                       linter.Cfserver.clearErrors(
+                           outputCollector.router, lines)))
+    outputCollector.addHandler(
+        linter.Handler("PROGRESS-START", linter.Cfserver.reportProgressStart))
+    outputCollector.addHandler(
+        linter.Handler("PROGRESS-END", linter.Cfserver.reportProgressEnd))
+
+    started = time.perf_counter()
+    timings = replayer.replay(outputCollector, args.speed)
+    elapsed = time.perf_counter() - started
+
+    size = sum(len(line) + 1 for (reply, _) in timings for line in reply)
+    print("%-24s %10d replies %10d bytes in %.3f s" % (
+        "replayed", len(timings), size, elapsed))
+    byCommand = {}
+    for (reply, seconds) in timings:
+        byCommand.setdefault(
+            linter.OutputCollector.firstWord(reply[0]), []).append(seconds)
+    for command in sorted(byCommand):
+        reportLatency(command, byCommand[command])
+    print("%-24s p99 %.2f ms" % ("all replies", percentile(
+        [seconds for (_, seconds) in timings], 99) * 1000))
+    for (reply, seconds) in sorted(timings, key=lambda t: -t[1])[:args.slowest]:
+        print("%10.2f ms  %6d lines  %s" % (seconds * 1000, len(reply), reply[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#
+# sublime.py
+# Headless stand-in for Sublime Text API used by benchmarks
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Minimal sublime module, enough to drive the plugin without editor."""
+
+import threading
+
+DRAW_NO_FILL = 32
+HIDDEN = 128
+TRANSIENT = 4
+
+
+class Region:
+
+    """ Range of text between a and b."""
+
+    def __init__(self, a, b=None):
+        """ Create new Region."""
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        """ Retrieve smaller end."""
+        return min(self.a, self.b)
+
+    def end(self):
+        """ Retrieve larger end."""
+        return max(self.a, self.b)
+
+    def size(self):
+        """ Retrieve number of characters covered."""
+        return self.end() - self.begin()
+
+    def empty(self):
+        """ Check whether region is empty."""
+        return self.a == self.b
+
+    def __eq__(self, other):
+        """ Compare regions."""
+        return (self.a, self.b) == (other.a, other.b)
+
+    def __repr__(self):
+        """ Represent region."""
+        return "Region(%d, %d)" % (self.a, self.b)
+
+
+class Settings:
+
+    """ Settings held in dictionary."""
+
+    def __init__(self, values=None):
+        """ Create new Settings."""
+        self.values = dict(values or {})
+
+    def get(self, key, default=None):
+        """ Retrieve setting."""
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        """ Change setting."""
+        self.values[key] = value
+
+    def has(self, key):
+        """ Check whether setting is there."""
+        return key in self.values
+
+
+class View:
+
+    """ In-memory view of one file."""
+
+    nextId = 1
+
+    def __init__(self, window, filename, text=""):
+        """ Create new View."""
+        self.viewId = View.nextId
+        View.nextId += 1
+        self.windowOfView = window
+        self.filename = filename
+        self.text = text
+        self.changeCount = 0
+        self.selection = [Region(0, 0)]
+        self.regions = {}
+        self.statuses = {}
+        self.viewSettings = Settings()
+
+    def id(self):
+        """ Retrieve view id."""
+        return self.viewId
+
+    def window(self):
+        """ Retrieve window of view."""
+        return self.windowOfView
+
+    def file_name(self):
+        """ Retrieve file name."""
+        return self.filename
+
+    def settings(self):
+        """ Retrieve view settings."""
+        return self.viewSettings
+
+    def size(self):
+        """ Retrieve number of characters."""
+        return len(self.text)
+
+    def substr(self, region):
+        """ Retrieve text of region."""
+        return self.text[region.begin():region.end()]
+
+    def line_endings(self):
+        """ Retrieve line endings of file."""
+        return "Unix"
+
+    def word(self, point):
+        """ Retrieve region of word around point."""
+        def isWordChar(ch):
+            return ch.isalnum() or ch == "_"
+        begin = end = point
+        while begin > 0 and isWordChar(self.text[begin - 1]):
+            begin -= 1
+        while end < len(self.text) and isWordChar(self.text[end]):
+            end += 1
+        return Region(begin, end)
+
+    def line(self, point):
+        """ Retrieve region of line around point, without line end."""
+        begin = self.text.rfind("\n", 0, point) + 1
+        end = self.text.find("\n", point)
+        return Region(begin, len(self.text) if end < 0 else end)
+
+    def change_count(self):
+        """ Retrieve number of changes."""
+        return self.changeCount
+
+    def replace_text(self, text):
+        """ Change whole text, as if typed by user."""
+        self.text = text
+        self.changeCount += 1
+
+    def is_dirty(self):
+        """ Check for unsaved changes."""
+        return False
+
+    def is_loading(self):
+        """ Check whether file is being loaded."""
+        return False
+
+    def is_scratch(self):
+        """ Check whether view is scratch buffer."""
+        return False
+
+    def sel(self):
+        """ Retrieve selection."""
+        return self.selection
+
+    def score_selector(self, point, selector):
+        """ Pretend every file is C++ source."""
+        return 1 if "c++" in selector else 0
+
+    def visible_region(self):
+        """ Retrieve visible part of text."""
+        return Region(0, min(len(self.text), 4000))
+
+    def show_at_center(self, region):
+        """ Scroll to region."""
+
+    def add_regions(self, key, regions, scope="", icon="", flags=0):
+        """ Remember regions under key."""
+        self.regions[key] = list(regions)
+
+    def get_regions(self, key):
+        """ Retrieve regions under key."""
+        return list(self.regions.get(key, []))
+
+    def erase_regions(self, key):
+        """ Forget regions under key."""
+        self.regions.pop(key, None)
+
+    def set_status(self, key, value):
+        """ Show status."""
+        self.statuses[key] = value
+
+    def erase_status(self, key):
+        """ Hide status."""
+        self.statuses.pop(key, None)
+
+    def run_command(self, command, args=None):
+        """ Run text command, only append is known."""
+        if command == "append":
+            self.replace_text(self.text + args["characters"])
+
+
+class Window:
+
+    """ Window holding views."""
+
+    def __init__(self, folders=None):
+        """ Create new Window."""
+        self.openViews = []
+        self.windowFolders = list(folders or [])
+        self.quickPanels = []
+        self.panels = {}
+
+    def open_file(self, filename, flags=0):
+        """ Open file in new view, or retrieve existing one."""
+        view = self.find_open_file(filename)
+        if view is None:
+            text = ""
+            try:
+                with open(filename, encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                pass
+            view = View(self, filename, text)
+            self.openViews.append(view)
+        return view
+
+    def find_open_file(self, filename):
+        """ Find view of file."""
+        for view in self.openViews:
+            if view.file_name() == filename:
+                return view
+        return None
+
+    def views(self):
+        """ Retrieve open views."""
+        return list(self.openViews)
+
+    def active_view(self):
+        """ Retrieve focused view."""
+        return self.openViews[-1] if self.openViews else None
+
+    def num_groups(self):
+        """ Retrieve number of groups."""
+        return 1
+
+    def active_view_in_group(self, group):
+        """ Retrieve focused view of group."""
+        return self.active_view()
+
+    def folders(self):
+        """ Retrieve project folders."""
+        return self.windowFolders
+
+    def project_file_name(self):
+        """ Retrieve project file name."""
+        return None
+
+    def show_quick_panel(self, items, on_done, flags=0, selected_index=-1,
+                         on_highlight=None):
+        """ Remember items shown."""
+        self.quickPanels.append(items)
+
+    def create_output_panel(self, name):
+        """ Create empty output panel."""
+        panel = self.panels[name] = View(self, None)
+        return panel
+
+    def run_command(self, command, args=None):
+        """ Run window command, no command has effect."""
+
+
+settings = Settings()
+window = Window()
+
+
+def load_settings(name):
+    """ Retrieve plugin settings."""
+    return settings
+
+
+def active_window():
+    """ Retrieve focused window."""
+    return window
+
+
+def windows():
+    """ Retrieve all windows."""
+    return [window]
+
+
+def status_message(message):
+    """ Show message in status bar."""
+
+
+def find_resources(pattern):
+    """ Find package resources."""
+    return ["Packages/Cfserver/gutter/" + pattern]
+
+
+def cache_path():
+    """ Retrieve directory for cached data."""
+    return None
+
+
+def set_timeout(callback, delay=0):
+    """ Run callback after delay milliseconds."""
+    timer = threading.Timer(delay / 1000.0, callback)
+    timer.daemon = True
+    timer.start()
+
+
+def set_timeout_async(callback, delay=0):
+    """ Run callback after delay milliseconds."""
+    set_timeout(callback, delay)
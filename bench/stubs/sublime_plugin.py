@@ -0,0 +1,38 @@
+#
+# sublime_plugin.py
+# Headless stand-in for Sublime Text plugin base classes
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Minimal sublime_plugin module, enough to import the plugin."""
+
+
+class EventListener:
+
+    """ Base of event listeners."""
+
+
+class TextCommand:
+
+    """ Base of commands working on view."""
+
+    def __init__(self, view):
+        """ Create command for view."""
+        self.view = view
+
+
+class WindowCommand:
+
+    """ Base of commands working on window."""
+
+    def __init__(self, window):
+        """ Create command for window."""
+        self.window = window
+
+
+class ApplicationCommand:
+
+    """ Base of application wide commands."""
@@ -0,0 +1,104 @@
+#
+# test_background.py
+# Check that background analysis leaves errors of focused view alone
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""Analyze file that is not open while another one has focus.
+
+Fake Cfserver answers every analysis with ERRORS-CLEAR that names no
+file, followed by errors. Clearing must apply to the file background
+analysis asked about, not to the view user is looking at. Runs without
+Sublime Text, using stub sublime module from stubs directory.
+
+    python3 bench/test_background.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "stubs"))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import sublime  # noqa
+import linter  # noqa
+
+
+class BackgroundAnalysisTest(unittest.TestCase):
+
+    """ Background analysis sharing daemon with focused view."""
+
+    TIMEOUT = 10
+
+    def setUp(self):
+        """ Create project of two sources, focus the first one."""
+        os.environ["FAKE_CFSERVER_ERRORS"] = "3"
+        sublime.settings.set(
+            "cfserver_path", os.path.join(HERE, "fake_cfserver.py"))
+        self.root = tempfile.mkdtemp()
+        for name in ("focused.cpp", "background.cpp"):
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write("int main() {\n    return 0;\n}\n")
+        sublime.window.windowFolders[:] = [self.root]
+        self.view = sublime.window.open_file(
+            os.path.join(self.root, "focused.cpp"))
+
+    def tearDown(self):
+        """ Stop daemons and remove project."""
+        linter.plugin_unloaded()
+        del sublime.window.openViews[:]
+        shutil.rmtree(self.root)
+
+    def waitFor(self, predicate):
+        """ Block until predicate holds, fail if it does not in time."""
+        deadline = time.time() + self.TIMEOUT
+        while not predicate():
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+
+    def regions(self):
+        """ Count regions drawn in focused view."""
+        with linter.ErrorsHandler.renderLock:
+            entry = linter.ErrorsHandler.rendered.get(self.view.id())
+        if entry is None:
+            return 0
+        return sum(len(self.view.get_regions(key)) for key in entry[1])
+
+    def test_focused_view_keeps_errors(self):
+        """ Background analysis does not erase errors of focused view."""
+        linter.Cfserver.analyzeModule(self.view)
+        self.waitFor(lambda: self.regions() > 0)
+        drawn = self.regions()
+        self.assertIsNotNone(
+            linter.Cfserver.diagnostics.peek(self.view.file_name()))
+
+        filename = os.path.join(self.root, "background.cpp")
+        daemon = linter.Cfserver.getDaemon(self.view)
+        stored = threading.Event()
+
+        def store(lines):
+            linter.Cfserver.storeFileErrors(filename, lines)
+            stored.set()
+
+        linter.Cfserver.analyzeFile(
+            daemon, filename, filename, store, timeout=self.TIMEOUT)
+        self.assertTrue(stored.wait(self.TIMEOUT))
+
+        self.assertIs(sublime.active_window().active_view(), self.view)
+        self.assertEqual(self.regions(), drawn)
+        self.assertIsNotNone(
+            linter.Cfserver.diagnostics.peek(self.view.file_name()))
+        self.assertIsNotNone(linter.Cfserver.diagnostics.peek(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
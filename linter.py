@@ -1,795 +1,4421 @@
-#
-# linter.py
-# Linter for Cfserver C/C++ static code analysis engine
-#
-# Copyright (c) 2014 Alexander Aprelev
-#
-# License: MIT
-#
-
-"""This module exports the Cfserver plugin class."""
-
-import subprocess
-import os
-import threading
-import re
-import queue
-import bisect
-import time
-
-import sublime
-import sublime_plugin
-
-
-class Definition:
-
-    """ Representation of Cfserver concept of definition."""
-
-    def __init__(self, filename, fromOfs, toOfs):
-        """ Create new Cfserver definition."""
-
-        self.filename = filename
-        self.fromOfs = fromOfs
-        self.toOfs = toOfs
-
-
-class Handler:
-
-    """ Handler of one type of Cfserver message."""
-
-    """ As Cfserver output is being processed, instances of
-        this class are called to handle particular type of
-        message."""
-
-    def __init__(self, type, proc):
-        """ Create new handler."""
-
-        self.type = type
-        self.proc = proc
-
-    def isMatch(self, type):
-        """ Check whether this handler is applicable or not."""
-
-        return type == self.type
-
-
-class OutputCollector:
-
-    """ Collector and processor of Cfserver output. """
-
-    def __init__(self, stdout):
-        """ Create new OutputCollector. """
-        self.stdout = stdout
-
-        self.handlers = []
-
-        self.buffers_queue = queue.Queue()
-        self.fulls = ""
-
-        self.isParserStayingAlive = True
-
-        self.readerThread = threading.Thread(target=self.read_stdout)
-        self.readerThread.start()
-        self.parserThread = threading.Thread(target=self.parse)
-        self.parserThread.start()
-
-    BUF_SIZE = 32767
-
-    def read_stdout(self):
-        """ Continuously read Cfserver stdout stream."""
-        stdout = self.stdout
-        buffers_queue = self.buffers_queue
-        while not stdout.closed:
-            data = os.read(stdout.fileno(), OutputCollector.BUF_SIZE)
-            print("read_stdout %s" % (data))
-
-            if len(data) > 0:
-                buffers_queue.put(data, block=False, timeout=None)
-            else:
-                stdout.close()
-                self.isParserStayingAlive = False
-                break
-
-    def parse(self):
-        """ Continuously parse what was read."""
-        while self.isParserStayingAlive:
-            self.parseSingleResponse(self.readLine())
-
-    # Number of seconds to wait, before we wake up
-    # and check whether we have to exit
-    MAX_WAIT = 5
-
-    def readLine(self):
-        """ Read just one line."""
-        fulls = self.fulls
-        while self.isParserStayingAlive:
-            cr = fulls.find("\n")
-            if (cr != -1):
-                # got full line
-                s = fulls[:cr]
-                if s.endswith('\r'):  # remove LF from Windows CR/LF
-                    s = s[:-1]
-                fulls = fulls[cr+1:]  # skip over CR
-                self.fulls = fulls
-                return s
-
-            # Now have to wait for next line
-            try:
-                data = self.buffers_queue.get(block=True,
-                                              timeout=OutputCollector.MAX_WAIT)
-                fulls += data.decode(encoding="ASCII")
-            except queue.Empty:
-                pass
-
-    @staticmethod
-    def firstWord(line):
-        """ Take first word. """
-        ndxSpace = line.find(" ")
-        return line[:ndxSpace] if ndxSpace != -1 else line
-
-    def readUntil(self, endCommand):
-        """ Keep reading until [endCommand] is encountered."""
-        strings = []
-        while True:
-            newline = self.readLine()
-            strings.append(newline + "\n")
-            if OutputCollector.firstWord(newline) == endCommand:
-                return ''.join(strings)
-
-    def parseSingleResponse(self, line):
-        """ Parse one Cfserver response."""
-        if line is None or line == "":
-            return
-        command = OutputCollector.firstWord(line)
-
-        buffer = "%s\n%s\n" % (line, self.readUntil(command + "-END"))
-        for handler in self.handlers:
-            if handler.isMatch(command):
-                handler.proc(buffer)
-
-    def addHandler(self, handler):
-        """ Add new Cfserver output handler."""
-        self.handlers.append(handler)
-
-    def removeHandler(self, handler):
-        """ Remove previously added Cfserver output handler."""
-        self.handlers.remove(handler)
-
-
-class Daemon:
-
-    """ Class responsible for starting/stopping Cfserver executable."""
-
-    def __init__(self, cmd, in_log, out_log):
-        """ Initialize new Daemon."""
-        self.start(cmd, in_log, out_log)
-        self.id = 0
-        self.responses = {}
-        self.registeredFiles = set()
-
-    def getNextUniqueId(self):
-        """ Generate unique id to be used for new Cfserver request."""
-        self.id += 1
-        return self.id
-
-    def start(self, cmd, in_log, out_log):
-        """ Start new Cfserver executable."""
-        startupinfo = None
-        if os.name == "nt":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-        command_line = [cmd, '--codeblocks', '--disable-cancel']
-        if in_log is not None and in_log != '':
-            command_line += ['--inLogName', in_log]
-        if out_log is not None and out_log != '':
-            command_line += ['--outLogName', out_log]
-
-        print("Starting %s" % (command_line))
-
-        self.proc = subprocess.Popen(
-            command_line,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=None,
-            startupinfo=startupinfo)
-
-        self.outputCollector = OutputCollector(self.proc.stdout)
-
-        print("Started cfserver proc pid=%d" % (self.proc.pid))
-
-        self.proc.stdin.write(bytes(
-            r'''#
-begin-config cmode
-gcc
-end-config
-begin-config cppmode
-g++
-end-config
-option +deCR_on
-''', "ascii"))
-
-    def restartIfInactive(self, cmd, in_log, out_log):
-        """ Restart process if it was never started or if it exited."""
-
-        if (self.proc is None or self.proc.poll() is not None):
-            self.start(cmd, in_log, out_log)
-            return True
-        else:
-            return False
-
-    def sendCommand(self, command):
-        """ Send new command to Cfserver executable."""
-        print(">> %s" % (command))
-        self.proc.stdin.write(bytes("%s%s" % (command, os.linesep), "ascii"))
-        self.proc.stdin.flush()
-
-    def isFileRegistered(self, filename):
-        """ Check whether we have registered this file already."""
-        return filename in self.registeredFiles
-
-    def registerFile(self, filename):
-        """ Register new file with Cfserver."""
-        self.registeredFiles.add(filename)
-
-
-class Cfserver():
-
-    """ Basic Sublime plugin functionality."""
-
-    def get_settings():
-        """ Retrieve settings."""
-        return sublime.load_settings("Cfserver.sublime-settings")
-
-    def get_setting(key, default=None, view=None):
-        """ Retrieve one settings."""
-        try:
-            if view is None:
-                view = sublime.active_window().active_view()
-            s = view.settings()
-            if s.has("cfserver_%s" % key):
-                return s.get("cfserver_%s" % key)
-        except:
-            pass
-        return Cfserver.get_settings().get(key, default)
-
-    daemon = None
-
-    @staticmethod
-    def getDaemon():
-        """ Retrieve existing daemon or creates new one."""
-        restarted = False
-        if Cfserver.daemon is None:
-            Cfserver.daemon = Daemon(
-                Cfserver.cfserverExecutable(),
-                Cfserver.cfserverInLog(),
-                Cfserver.cfserverOutLog())
-            restarted = True
-        else:
-            restarted = Cfserver.daemon.restartIfInactive(
-                Cfserver.cfserverExecutable(),
-                Cfserver.cfserverInLog(),
-                Cfserver.cfserverOutLog())
-
-        if (restarted):
-            Cfserver.daemon.outputCollector.addHandler(ErrorsHandler())
-            Cfserver.daemon.outputCollector.addHandler(
-                Handler("ERRORS-CLEAR", Cfserver.clearErrors))
-            Cfserver.daemon.outputCollector.addHandler(
-                Handler("PROGRESS-START", Cfserver.reportProgressStart))
-            Cfserver.daemon.outputCollector.addHandler(
-                Handler("PROGRESS-END", Cfserver.reportProgressEnd))
-
-        return Cfserver.daemon
-
-    @staticmethod
-    def cfserverExecutable():
-        """ Retrieve cfserver executable name from settings."""
-        return Cfserver.get_setting("cfserver_path", "cfserver.exe")
-
-    @staticmethod
-    def cfserverInLog():
-        """ Retrieve location for cfserver in log from settings."""
-        return Cfserver.get_setting("cfserver_inlog", "in")
-
-    @staticmethod
-    def cfserverOutLog():
-        """ Retrieve location for cfserver out log from settings."""
-        return Cfserver.get_setting("cfserver_outlog", "out")
-
-    @staticmethod
-    def registerFileIfNotLoaded(filename):
-        """ Ask Cfserver to load the  file if see it for the first time."""
-        daemon = Cfserver.getDaemon()
-        if (not daemon.isFileRegistered(filename)):
-            daemon.registerFile(filename)
-            basename = os.path.basename(filename)
-            print("registerFileIfNotLoaded basename='%s'" % basename)
-            if basename.endswith(".h") or basename.endswith(".hh"):
-                pass
-            else:
-                daemon.sendCommand("module \"%s\" %s" % (
-                    filename.replace("\\", "\\\\"),
-                    "cmode" if os.path.basename(filename).endswith(".c")
-                    else "cppmode"))
-            return True
-        else:
-            return False
-
-    @staticmethod
-    def analyzeModule(view):
-        """ Issue Cfserver command to analyze file in given view."""
-        daemon = Cfserver.getDaemon()
-        filename = view.file_name().replace("\\", "\\\\")
-        if not Cfserver.registerFileIfNotLoaded(view.file_name()):
-            daemon.sendCommand("reload \"%s\"" % (filename))
-        idErrors = daemon.getNextUniqueId()
-        daemon.sendCommand(
-            "analyze -n %d \"%s\" 0 end" % (idErrors, filename))
-
-    reProgressStart = re.compile(
-        r'PROGRESS-START \"(?P<message>.+)\"',
-        re.MULTILINE)
-
-    @staticmethod
-    def reportProgressStart(message):
-        """ Handle PROGRESS-START Cfserver response."""
-        match = Cfserver.reProgressStart.match(message)
-        if match:
-            sublime.status_message("Cfserver: %s" % (match.group('message')))
-
-    @staticmethod
-    def reportProgressEnd(message):
-        """ Handle PROGRESS-END Cfserver response."""
-        sublime.status_message("")
-
-    errorsInFile = {}  # Selection of errors in particular file.
-
-    REGION_ERRORS = "cfserver_errors"
-    REGION_WARNINGS = "cfserver_warnings"
-
-    @staticmethod
-    def clearErrors(message):
-        """ Handle ERRORS-CLEAR Cfserver response."""
-        # fishy, but there is no indication regarding what file
-        # errors are being cleared for
-        view = sublime.active_window().active_view()
-        view.erase_regions(Cfserver.REGION_ERRORS)
-        view.erase_regions(Cfserver.REGION_WARNINGS)
-        Cfserver.errorsInFile = {}
-
-
-class ErrorsInFile:
-
-    """ Holder of all errors/warnings in particular file."""
-
-    def __init__(self,
-                 regionsLeftBoundaries=None,
-                 messages=None):
-        """ Initialize holder."""
-        self.regionsLeftBoundaries = regionsLeftBoundaries
-        self.messages = messages
-
-
-class ErrorsHandler(Handler):
-
-    """ Handler for ERRORS Cfserver response."""
-
-    def __init__(self):
-        """ Initialize handler."""
-        super().__init__("ERRORS", self.proc)
-
-    reErrors = re.compile(
-        r'((.*)(\r?\n))*^ERRORS \"(?P<filename>.+)\"\s(?P<id>\d+)\r?\n'
-        r'(?P<allerrors>((.*)\r?\n)+)'
-        r'^ERRORS-END(\r?\n)?',
-        re.MULTILINE)
-
-    reErrorWithOffsets = re.compile(
-        r'(?P<type>(ERROR|WARN|INFO)) '
-        r'(?P<fromOfs>\d+) (?P<toOfs>\d+) (?P<message>.+)\r?\n')
-
-    mark_error_png = None
-
-    @staticmethod
-    def getMarkErrorPng():
-        """ Retrieve png for error mark."""
-        if ErrorsHandler.mark_error_png is None:
-            ErrorsHandler.mark_error_png = sublime.find_resources(
-                "cfserver-mark-error.png")[0]
-        return ErrorsHandler.mark_error_png
-
-    mark_warning_png = None
-
-    @staticmethod
-    def getMarkWarningPng():
-        """ Retrieve png for warning mark."""
-
-        if ErrorsHandler.mark_warning_png is None:
-            ErrorsHandler.mark_warning_png = sublime.find_resources(
-                "cfserver-mark-warning.png")[0]
-        return ErrorsHandler.mark_warning_png
-
-    def proc(self, message):
-        """ Parse and process errors reported by Cfserver."""
-        match = ErrorsHandler.reErrors.match(message)
-        # print("got message '%s' and match is '%s'" % (message, match))
-        if match:
-            view = sublime.active_window().find_open_file(
-                match.group('filename'))
-            if view:  # file is still around
-                filename = view.file_name()
-                matchErrorsWithOffsets = (
-                    ErrorsHandler.reErrorWithOffsets.finditer(
-                        match.group('allerrors')))
-                regionsErrors = []
-                regionsWarnings = []
-                messages = {}
-                for matchedError in matchErrorsWithOffsets:
-                    fromOfs = int(matchedError.group('fromOfs'))
-                    toOfs = int(matchedError.group('toOfs'))
-                    message = matchedError.group('message').replace("\r", "")
-                    error_type = matchedError.group('type')
-
-                    region = sublime.Region(fromOfs, toOfs)
-                    if (error_type == 'ERROR'):
-                        regionsErrors.append(region)
-                    else:
-                        regionsWarnings.append(region)
-                    if fromOfs not in messages:
-                        messages[fromOfs] = []
-                    messages[fromOfs].append((toOfs, message))
-
-                for message in messages.values():
-                    message.sort(key=lambda r: r[0])
-
-                view.add_regions(Cfserver.REGION_ERRORS,
-                                 regionsErrors,
-                                 "invalid.deprecated",
-                                 ErrorsHandler.getMarkErrorPng(),
-                                 sublime.DRAW_NO_FILL)
-                view.add_regions(Cfserver.REGION_WARNINGS,
-                                 regionsWarnings,
-                                 "invalid",
-                                 ErrorsHandler.getMarkWarningPng(),
-                                 sublime.DRAW_NO_FILL)
-                Cfserver.errorsInFile[filename] = ErrorsInFile(
-                    regionsLeftBoundaries=sorted(
-                        list(r.a for r in regionsErrors) +
-                        list(r.a for r in regionsWarnings)),
-                    messages=messages)
-
-
-class CfserverEventListener(sublime_plugin.EventListener):
-
-    """ Plugin event listener."""
-
-    def on_activated(self, view):
-        """ Handle on_activated event."""
-        if is_supported_language(view) and view.file_name() is not None:
-            # Cfserver.selectModule(view.file_name())
-            Cfserver.analyzeModule(view)
-
-    def on_load_async(self, view):
-        """ Handle on_load_async event."""
-        if is_supported_language(view) and view.file_name() is not None:
-            # Cfserver.selectModule(view.file_name())
-            Cfserver.analyzeModule(view)
-
-    def on_post_save_async(self, view):
-        """ Handle on_post_save_async event."""
-        if is_supported_language(view) and view.file_name() is not None:
-            # Cfserver.selectModule(view.file_name())
-            Cfserver.analyzeModule(view)
-
-    def on_query_completions(self, view, prefix, locations):
-        """ Handle on_query_completions event."""
-        return []
-        if is_supported_language(view) and view.file_name is not None:
-            print("on_query_completions: in %s with %s at %s " %
-                  (view, prefix, locations))
-            return [("Try this " + prefix, "sugs")]
-
-    def on_selection_modified_async(self, view):
-        """Handle selection changes (cursor moves or text selected)."""
-        filename = view.file_name()
-        if is_supported_language(view) and filename is not None:
-            if (filename in Cfserver.errorsInFile):
-                selection = view.sel()[0]
-                errors = Cfserver.errorsInFile[filename]
-                rightmostLower = bisect.bisect_left(
-                    errors.regionsLeftBoundaries, selection.a)
-                if rightmostLower:
-                    rightmostLowerMessages = (
-                        errors.messages[
-                            errors.regionsLeftBoundaries[rightmostLower - 1]])
-                    messages = []
-                    for m in rightmostLowerMessages:
-                        if m[0] < selection.a:
-                            continue
-                        messages.append(m[1])
-                    view.set_status("cfserver_errors", ",".join(messages))
-                    return
-        view.erase_status("cfserver_errors")
-
-
-def is_supported_language(view):
-    """ Confirm whether view hosts source C/C++ code."""
-    if view.is_scratch() or view.file_name() is None:
-        return False
-    caret = view.sel()[0].a
-    return (view.score_selector(caret, "source.c++ ") +
-            view.score_selector(caret, "source.c ")) > 0
-
-
-class CfserverFind(sublime_plugin.TextCommand):
-
-    """ Navigation command."""
-
-    def set_find_command(self, find_command):
-        self.find_command = find_command
-
-    def is_enabled(self):
-        return is_supported_language(sublime.active_window().active_view())
-
-    def is_visible(self):
-        return is_supported_language(sublime.active_window().active_view())
-
-    """ Support navigation to definitions."""
-
-    def run(self, edit):
-        """ Send find command request to Cfserver."""
-
-        daemon = Cfserver.getDaemon()
-        daemon.outputCollector.addHandler(self.handler())
-
-        daemon.sendCommand(self.command())
-        Cfserver.analyzeModule(self.view)
-
-class CfserverContextFind(CfserverFind):
-    def handler(self):
-        return UsagesHandler()
-
-    def command(self):
-        view = self.view
-        offset = view.sel()[0].a
-
-        return "%s \"%s\" %d" % (
-                self.find_command,
-                view.file_name().replace("\\", "\\\\"),
-                offset)
-
-
-class UsagesHandler(Handler):
-
-    """ Handler for USAGES Cfserver response."""
-
-    def __init__(self):
-        """ Initialize handler."""
-        super().__init__("USAGES", self.proc)
-
-    def reUsages(self):
-        return re.compile(
-            r'((.*)(\r?\n))*^USAGES (?P<type>.+) \"(?P<name>.+)\"\r?\n'
-            r'(?P<allusages>((.+)\r?\n)+)'
-            r'^USAGES-END(\r?\n)?',
-            re.MULTILINE)
-
-    def reUsage(self):
-        return re.compile(
-            r'^(?P<type>.+) '
-            r'\"(?P<filename>.+)\" '
-            r'(?P<fromOfs>\d+) (?P<toOfs>\d+) '
-            r'\"(?P<quote>(?:[^"\\]|\\.)*)\" '
-            r'.+\r?\n',
-            re.MULTILINE)
-
-    def proc(self, message):
-        """ Parse and process usages reported by Cfserver."""
-        Cfserver.daemon.outputCollector.removeHandler(self)
-
-        match = self.reUsages().match(message)
-        if match is None:
-            return
-
-        matchUsage = self.reUsage().finditer(match.group('allusages'))
-        if matchUsage is None:
-            return
-
-        hits = []
-        for matchedUsage in matchUsage:
-            matchtype = matchedUsage.group('type')
-            filename = matchedUsage.group('filename')
-            fromOfs = int(matchedUsage.group('fromOfs'))
-            toOfs = int(matchedUsage.group('toOfs'))
-            quote = bytes(matchedUsage.group('quote'),
-                          "ascii").decode("unicode_escape").strip()
-            hits.append((matchtype, filename, fromOfs, toOfs, quote))
-
-        if len(hits) > 1:
-            sublime.active_window().show_quick_panel(
-                ["%s: %s" % (h[0], h[4]) for h in hits],
-                lambda index: UsagesHandler.selectHit(
-                    hits[index] if index != -1 else None))
-        elif len(hits) == 1:
-            UsagesHandler.selectHit(hits[0])
-
-    @staticmethod
-    def selectHit(hit):
-        if hit:
-            (matchtype, filename, fromOfs, toOfs, quote) = hit
-            view = sublime.active_window().open_file(filename)
-            if view.is_loading():
-                threading.Thread(
-                    target=UsagesHandler.navigate_to_location_once_loaded,
-                    args=(view, hit)).start()
-            else:
-                view.sel().clear()
-                view.sel().add(sublime.Region(fromOfs, toOfs))
-                view.show_at_center(view.sel()[0])
-
-    @staticmethod
-    def navigate_to_location_once_loaded(view, hit):
-        while view.is_loading():
-            time.sleep(1)  # sleep for 1 sec
-        view.sel().clear()
-        (matchtype, filename, fromOfs, toOfs, quote) = hit
-        view.sel().add(sublime.Region(fromOfs, toOfs))
-        view.show_at_center(view.sel()[0])
-
-
-class CfserverGotoDef(CfserverContextFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("goto-def")
-
-
-class CfserverFindUsages(CfserverContextFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-usages")
-
-
-class CfserverFindDecls(CfserverContextFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-declarators")
-
-
-class CfserverFindParents(CfserverContextFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-parents")
-
-
-class CfserverFindInheritors(CfserverContextFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-inheritors")
-
-
-class UsagesNamesHandler(UsagesHandler):
-
-    """ Handler for USAGES NAMES Cfserver response."""
-
-    def reUsages(self):
-        return re.compile(
-            r'((.*)(\r?\n))*^USAGES (?P<type>.+) \"(?P<name>.*)\" \"(?P<arg>.+)\"\r?\n'
-            r'(?P<allusages>((.+)\r?\n)+)'
-            r'^USAGES-END(\r?\n)?',
-            re.MULTILINE)
-
-    def reUsage(self):
-        return re.compile(
-            r'^(?P<type>.+) '
-            r'\"(?P<filename>.+)\" '
-            r'\"(?P<filename1>.+)\" '
-            r'(?P<somenum>\d+) '
-            r'(?P<fromOfs>\d+) (?P<toOfs>\d+) '
-            r'\"(?P<quote>(?:[^"\\]|\\.)*)\" '
-            r'.*\r?\n',
-            re.MULTILINE)
-
-
-class CfserverGlobalFind(CfserverFind):
-
-    def handler(self):
-        return UsagesNamesHandler()
-
-    def command(self):
-        return "%s \"%s\" \"%s\"" % (self.find_command, "", "system")
-
-
-class CfserverFindNames(CfserverGlobalFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-names")
-
-
-class CfserverFindNamesInFile(CfserverFind):
-
-    def handler(self):
-        return UsagesNamesHandler()
-
-    def command(self):
-        view = self.view
-
-        return "%s \"%s\" \"\"" % (
-                self.find_command,
-                view.file_name().replace("\\", "\\\\"))
-
-        return "%s \"%s\" \"%s\"" % (self.find_command, "", "system")
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-names-in-file")
-
-
-class CfserverFindMacros(CfserverGlobalFind):
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-macros")
-
-
-class UsagesFileNamesHandler(UsagesNamesHandler):
-
-    """ Handler for USAGES filenames Cfserver response."""
-
-    def reUsage(self):
-        return re.compile(
-            r'^(?P<type>.+) '
-            r'\"(?P<filename>.+)\" '
-            r'(?P<fromOfs>\d+) (?P<toOfs>\d+) '
-            r'\"(?P<string>[^\"]*)\" '
-            r'(?P<num1>\d+) (?P<num2>\d+) (?P<num3>\d+) '
-            r'\"(?P<quote>(?:[^"\\]|\\.)*)\" '
-            r'(?P<num4>\d+) (?P<num5>\d+) '
-            r'(?P<recursive>.+)'
-            r'\r?\n',
-            re.MULTILINE)
-
-
-class CfserverFindFiles(CfserverGlobalFind):
-
-    def handler(self):
-        return UsagesFileNamesHandler()
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-files")
-
-
-class UsagesStringsNamesHandler(UsagesNamesHandler):
-
-    """ Handler for USAGES strings Cfserver response."""
-
-    def reUsage(self):
-        return re.compile(
-            r'^(?P<type>.+) '
-            r'\"(?P<filename>.+)\" '
-            r'(?P<fromOfs>\d+) (?P<toOfs>\d+) '
-            r'\"(?P<quote>(?:[^"\\]|\\.)*)\" '
-            r'(?P<num1>\d+) (?P<num2>\d+) (?P<num3>\d+) '
-            r'\"(?P<filename1>[^\"]+)\" '
-            r'(?P<num4>\d+) (?P<num5>\d+) '
-            r'(?P<recursive>.+)'
-            r'\r?\n',
-            re.MULTILINE)
-
-
-
-class CfserverFindStrings(CfserverGlobalFind):
-
-    def handler(self):
-        return UsagesStringsNamesHandler()
-
-    def __init__(self, view):
-        super().__init__(view)
-        self.set_find_command("find-strings")
+#
+# linter.py
+# Linter for Cfserver C/C++ static code analysis engine
+#
+# Copyright (c) 2014 Alexander Aprelev
+#
+# License: MIT
+#
+
+"""This module exports the Cfserver plugin class.
+
+Outside of Sublime Text it is command line tool analyzing files with
+cfserver, several at a time, and writing errors as JSON lines or SARIF:
+
+    python3 linter.py --cfserver /path/to/cfserver --format sarif src/
+"""
+
+import argparse
+import collections
+import contextlib
+import heapq
+import itertools
+import multiprocessing
+import json
+import subprocess
+import os
+import tempfile
+import threading
+import re
+import select
+import sys
+import queue
+import array
+import bisect
+import time
+import traceback
+import types
+import urllib.parse
+import zlib
+
+try:
+    import sublime
+    import sublime_plugin
+except ImportError:
+    # Used as library or command line tool; plugin classes are defined,
+    # but nothing ever runs them.
+    sublime = None
+    sublime_plugin = types.SimpleNamespace(
+        EventListener=object, TextCommand=object, WindowCommand=object)
+
+
+def set_timeout_async(callback, delay=0):
+    """ Call callback after delay milliseconds on some other thread."""
+    if sublime is not None:
+        sublime.set_timeout_async(callback, delay)
+    else:
+        timer = threading.Timer(delay / 1000.0, callback)
+        timer.daemon = True
+        timer.start()
+
+
+class Definition:
+
+    """ Representation of Cfserver concept of definition."""
+
+    def __init__(self, filename, fromOfs, toOfs):
+        """ Create new Cfserver definition."""
+
+        self.filename = filename
+        self.fromOfs = fromOfs
+        self.toOfs = toOfs
+
+
+class Handler:
+
+    """ Handler of one type of Cfserver message."""
+
+    """ As Cfserver output is being processed, instances of
+        this class are called to handle particular type of
+        message."""
+
+    def __init__(self, type, proc):
+        """ Create new handler."""
+
+        self.type = type
+        self.proc = proc
+
+    def isMatch(self, type):
+        """ Check whether this handler is applicable or not."""
+
+        return type == self.type
+
+
+class StageStats:
+
+    """ Timings of one stage of processing."""
+
+    # Histogram bucket n holds timings of [2^(n-1), 2^n) microseconds.
+    BUCKETS = 28
+
+    # Number of slowest timings remembered.
+    SLOWEST = 10
+
+    def __init__(self):
+        """ Create empty StageStats."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.amount = 0
+        self.histogram = [0] * StageStats.BUCKETS
+        self.slowest = []  # heap of (seconds, sequence, detail)
+
+    def add(self, seconds, detail, amount):
+        """ Account one timing."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.amount += amount
+        bucket = min(int(seconds * 1000000).bit_length(),
+                     StageStats.BUCKETS - 1)
+        self.histogram[bucket] += 1
+        entry = (seconds, self.count, detail)
+        if len(self.slowest) < StageStats.SLOWEST:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def percentile(self, p):
+        """ Estimate p-th percentile of timings from histogram."""
+        target = self.count * p / 100.0
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min((1 << bucket) / 1000000.0, self.max)
+        return 0.0
+
+    def toJson(self):
+        """ Represent as JSON friendly dictionary."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "amount": self.amount,
+            "histogram": self.histogram,
+            "slowest": [[seconds, detail] for (seconds, _, detail)
+                        in sorted(self.slowest, reverse=True)],
+        }
+
+
+class Stats:
+
+    """ Timing counters of plugin hot paths."""
+
+    """ Stages are named by where time goes: reading Cfserver output,
+        framing it, parsing replies, handlers, and event listener
+        callbacks running on Sublime UI thread."""
+
+    def __init__(self):
+        """ Create empty Stats."""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Forget everything counted so far."""
+        with self.lock:
+            self.stages = {}
+            self.started = time.monotonic()
+
+    def add(self, stage, seconds, detail=None, amount=0):
+        """ Account seconds spent in stage, along with amount of data."""
+        with self.lock:
+            stageStats = self.stages.get(stage)
+            if stageStats is None:
+                stageStats = self.stages[stage] = StageStats()
+            stageStats.add(seconds, detail, amount)
+
+    @contextlib.contextmanager
+    def timed(self, stage, detail=None):
+        """ Account time spent in with block to stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started, detail)
+
+    def report(self):
+        """ Format stats as text."""
+        with self.lock:
+            stages = sorted(self.stages.items())
+            elapsed = time.monotonic() - self.started
+        lines = ["Cfserver statistics over %.0f s" % (elapsed), ""]
+        lines.append("%-32s %8s %10s %9s %9s %9s %9s %12s" % (
+            "stage", "count", "total ms", "mean ms", "p50 ms", "p99 ms",
+            "max ms", "bytes"))
+        for name, stage in stages:
+            lines.append(
+                "%-32s %8d %10.1f %9.3f %9.3f %9.3f %9.3f %12d" % (
+                    name, stage.count, stage.total * 1000,
+                    stage.total * 1000 / max(stage.count, 1),
+                    stage.percentile(50) * 1000, stage.percentile(99) * 1000,
+                    stage.max * 1000,
+                    stage.amount))
+        for name, stage in stages:
+            lines += ["", "%s: histogram" % (name)]
+            peak = max(stage.histogram)
+            for bucket, count in enumerate(stage.histogram):
+                if count:
+                    lines.append("  < %10d us %8d %s" % (
+                        1 << bucket, count, "#" * (1 + 40 * count // peak)))
+            lines.append("%s: slowest" % (name))
+            for (seconds, _, detail) in sorted(stage.slowest, reverse=True):
+                lines.append("  %10.3f ms  %s" % (
+                    seconds * 1000, "" if detail is None else detail))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """ Write stats to path as JSON."""
+        with self.lock:
+            data = {
+                "elapsed": time.monotonic() - self.started,
+                "stages": dict((name, stage.toJson())
+                               for name, stage in self.stages.items()),
+            }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+
+
+class ResponseFramer:
+
+    """ Incremental splitter of Cfserver output into responses."""
+
+    """ Bytes read from Cfserver are appended to a single bytearray
+        that is scanned for newlines only once. Lines are decoded
+        straight out of the buffer, and the consumed prefix is dropped
+        only after it outgrows the unconsumed tail, so framing a reply
+        stays linear in its size."""
+
+    def __init__(self, encoding="utf-8"):
+        """ Create new ResponseFramer."""
+        self.encoding = encoding
+        self.buffer = bytearray()
+        self.start = 0  # first byte that was not handed out yet
+        self.scanned = 0  # no newline between start and scanned
+        self.block = None  # lines of response being assembled
+        self.endCommand = None
+
+    def feed(self, data):
+        """ Append bytes read from Cfserver."""
+        if self.start > 0 and self.start * 2 >= len(self.buffer):
+            del self.buffer[:self.start]
+            self.scanned -= self.start
+            self.start = 0
+        self.buffer += data
+
+    def nextLine(self):
+        """ Take next complete line, None if there is none yet."""
+        buffer = self.buffer
+        lf = buffer.find(b"\n", self.scanned)
+        if lf == -1:
+            self.scanned = len(buffer)
+            return None
+        end = lf
+        if end > self.start and buffer[end - 1] == 0x0d:
+            end -= 1  # remove LF from Windows CR/LF
+        with memoryview(buffer) as view:
+            line = str(view[self.start:end], self.encoding, "replace")
+        self.start = self.scanned = lf + 1
+        return line
+
+    def nextResponse(self):
+        """ Take next complete X ... X-END response as list of lines."""
+        while True:
+            line = self.nextLine()
+            if line is None:
+                return None
+            if self.block is None:
+                if line == "":
+                    continue
+                self.block = [line]
+                self.endCommand = OutputCollector.firstWord(line) + "-END"
+            else:
+                self.block.append(line)
+                if OutputCollector.firstWord(line) == self.endCommand:
+                    block = self.block
+                    self.block = None
+                    return block
+
+    def responses(self):
+        """ Iterate over all responses that are complete by now."""
+        while True:
+            response = self.nextResponse()
+            if response is None:
+                return
+            yield response
+
+
+class OutputLoop:
+
+    """ Single thread reading stdout of every running Cfserver."""
+
+    """ Output is framed and dispatched right on loop thread, as soon as
+        it is read. Thread starts with first collector added and exits
+        once last one is removed. select() works on pipes only on POSIX,
+        on Windows every collector keeps its own reader thread."""
+
+    def __init__(self):
+        """ Create idle OutputLoop."""
+        self.lock = threading.Lock()
+        self.collectors = {}  # stdout fd -> OutputCollector
+        self.thread = None
+        self.wakeRead = None
+        self.wakeWrite = None
+        self.isWoken = False
+
+    @staticmethod
+    def isSupported():
+        """ Tell whether select() can wait for pipes."""
+        return os.name != "nt"
+
+    def add(self, collector):
+        """ Start reading stdout of collector."""
+        with self.lock:
+            self.collectors[collector.stdout.fileno()] = collector
+            if self.thread is None:
+                (self.wakeRead, self.wakeWrite) = os.pipe()
+                self.isWoken = False
+                self.thread = threading.Thread(target=self.run)
+                self.thread.start()
+            else:
+                self.wake()
+
+    def remove(self, collector):
+        """ Stop reading stdout of collector."""
+        with self.lock:
+            fd = collector.fd
+            if self.collectors.get(fd) is collector:
+                del self.collectors[fd]
+                self.wake()
+
+    def wake(self):
+        """ Make loop notice change of collectors, lock must be held."""
+        if self.thread is not None and not self.isWoken:
+            self.isWoken = True
+            os.write(self.wakeWrite, b"\0")
+
+    def run(self):
+        """ Wait for output of any Cfserver and dispatch it."""
+        while True:
+            with self.lock:
+                if not self.collectors:
+                    os.close(self.wakeRead)
+                    os.close(self.wakeWrite)
+                    self.wakeRead = self.wakeWrite = None
+                    self.thread = None
+                    return
+                wakeRead = self.wakeRead
+                fds = list(self.collectors)
+            try:
+                (ready, _, _) = select.select(fds + [wakeRead], [], [])
+            except InterruptedError:
+                continue
+            except (OSError, ValueError) as e:
+                print("Cfserver: select failed: %s" % (e))
+                self.removeClosed()
+                continue
+            for fd in ready:
+                if fd == wakeRead:
+                    with self.lock:
+                        os.read(wakeRead, 64)
+                        self.isWoken = False
+                    continue
+                with self.lock:
+                    collector = self.collectors.get(fd)
+                if collector is None:
+                    continue
+                try:
+                    isOpen = collector.readAvailable()
+                except OSError:
+                    isOpen = False
+                except Exception:
+                    # one bad handler must not stop output of all Cfservers
+                    traceback.print_exc()
+                    isOpen = True
+                if not isOpen:
+                    self.remove(collector)
+                    collector.stdout.close()
+
+    def removeClosed(self):
+        """ Remove collectors whose stdout got closed elsewhere."""
+        with self.lock:
+            for fd, collector in list(self.collectors.items()):
+                if collector.stdout.closed:
+                    del self.collectors[fd]
+
+
+class OutputCollector:
+
+    """ Collector and processor of Cfserver output. """
+
+    def __init__(self, stdout, router=None, recorder=None):
+        """ Create new OutputCollector. """
+
+        """ Without stdout nothing is read, and output is to be passed
+            to feed() by the caller."""
+        self.stdout = stdout
+        self.router = router
+        self.recorder = recorder
+
+        # Reply type -> handlers; lists are replaced, never changed, so
+        # handlers can be added while output is being dispatched.
+        self.handlers = {}
+
+        self.framer = ResponseFramer()
+
+        # Held while output is parsed, so close() can wait for it.
+        self.feedLock = threading.RLock()
+        self.isAttached = stdout is not None
+
+        self.fd = None
+        self.readerThread = None
+        if stdout is not None:
+            self.fd = stdout.fileno()
+            if OutputLoop.isSupported():
+                Cfserver.outputLoop.add(self)
+            else:
+                self.readerThread = threading.Thread(target=self.read_stdout)
+                self.readerThread.start()
+
+    BUF_SIZE = 32767
+
+    def readAvailable(self, isReady=True):
+        """ Read and parse Cfserver output, tell whether there is more."""
+
+        """ Read is timed only if output is known to be there already,
+            otherwise it would time waiting for Cfserver to write."""
+        started = time.perf_counter()
+        data = os.read(self.fd, OutputCollector.BUF_SIZE)
+        if isReady:
+            Cfserver.stats.add("read", time.perf_counter() - started,
+                               amount=len(data))
+        with self.feedLock:
+            if not self.isAttached:
+                return False
+            if len(data) == 0:
+                self.isAttached = False
+                if self.router is not None:
+                    # Cfserver exited, nothing is going to be answered
+                    self.router.cancelAll()
+                return False
+            self.feed(data)
+            return True
+
+    def read_stdout(self):
+        """ Continuously read Cfserver stdout stream."""
+        while self.readAvailable(isReady=False):
+            pass
+        self.stdout.close()
+
+    def feed(self, data):
+        """ Parse bytes of Cfserver output."""
+        framer = self.framer
+        stats = Cfserver.stats
+        started = time.perf_counter()
+        framer.feed(data)
+        while True:
+            response = framer.nextResponse()
+            stats.add("frame", time.perf_counter() - started,
+                      amount=len(data))
+            if response is None:
+                break
+            data = b""  # count bytes only once
+            self.parseSingleResponse(response)
+            started = time.perf_counter()
+
+    @staticmethod
+    def firstWord(line):
+        """ Take first word. """
+        ndxSpace = line.find(" ")
+        return line[:ndxSpace] if ndxSpace != -1 else line
+
+    def parseSingleResponse(self, lines):
+        """ Parse one Cfserver response."""
+        command = OutputCollector.firstWord(lines[0])
+        with Cfserver.stats.timed("dispatch %s" % (command), lines[0]):
+            self.dispatch(command, lines)
+
+    def dispatch(self, command, lines):
+        """ Pass response to request it answers or to handlers."""
+
+        if self.recorder is not None:
+            self.recorder.recordReply(
+                RequestRouter.replyId(command, lines), lines)
+        if self.router is not None and self.router.route(command, lines):
+            return
+        for handler in self.handlers.get(command, ()):
+            handler.proc(lines)
+
+    def close(self, timeout=1):
+        """ Stop reading, wait for output being parsed."""
+
+        """ Nothing is dispatched to handlers once close() returns,
+            unless it is called from a handler."""
+        if self.stdout is None:
+            return
+        if self.readerThread is None:
+            Cfserver.outputLoop.remove(self)
+        with self.feedLock:
+            self.isAttached = False
+        thread = self.readerThread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def addHandler(self, handler):
+        """ Add new Cfserver output handler."""
+        self.handlers[handler.type] = (
+            self.handlers.get(handler.type, []) + [handler])
+
+    def removeHandler(self, handler):
+        """ Remove previously added Cfserver output handler."""
+        handlers = [h for h in self.handlers.get(handler.type, ())
+                    if h is not handler]
+        if handlers:
+            self.handlers[handler.type] = handlers
+        else:
+            self.handlers.pop(handler.type, None)
+
+
+ErrorRecord = collections.namedtuple(
+    "ErrorRecord", ["type", "fromOfs", "toOfs", "message"])
+
+UsageRecord = collections.namedtuple(
+    "UsageRecord", ["type", "filename", "fromOfs", "toOfs", "quote"])
+
+
+class ResponseParser:
+
+    """ Single pass parser of one Cfserver response."""
+
+    """ Parser is a state machine fed one line at a time: header line
+        first, then one record per line until the -END line. Lines
+        before the header and malformed records are skipped, just like
+        regular expressions this parser replaced used to skip them."""
+
+    HEADER, RECORDS, DONE = range(3)
+
+    reFields = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+    def __init__(self, command):
+        """ Create parser for response to given command."""
+        self.command = command
+        self.endCommand = command + "-END"
+        self.state = ResponseParser.HEADER
+        self.header = None
+        self.records = []
+
+    @staticmethod
+    def splitFields(text):
+        """ Split text into bare words and quoted strings."""
+
+        """ Quoted strings are returned without quotes, with their
+            escape sequences left intact."""
+        return [quoted if bare == "" else bare
+                for quoted, bare in ResponseParser.reFields.findall(text)]
+
+    def feedLine(self, line):
+        """ Advance parser by one line."""
+        state = self.state
+        if state == ResponseParser.RECORDS:
+            if OutputCollector.firstWord(line) == self.endCommand:
+                self.state = ResponseParser.DONE
+            else:
+                record = self.parseRecord(line)
+                if record is not None:
+                    self.records.append(record)
+        elif state == ResponseParser.HEADER:
+            if OutputCollector.firstWord(line) == self.command:
+                self.header = self.parseHeader(line)
+                if self.header is not None:
+                    self.state = ResponseParser.RECORDS
+
+    def parse(self, lines):
+        """ Feed all lines of response, tell whether it was complete."""
+        lines = iter(lines)
+        for line in lines:
+            self.feedLine(line)
+            if self.state != ResponseParser.HEADER:
+                break
+        # Same as feeding the rest line by line, minus per-line overhead.
+        endCommand = self.endCommand
+        parseRecord = self.parseRecord
+        records = self.records
+        for line in lines:
+            if (line.startswith(endCommand) and
+                    OutputCollector.firstWord(line) == endCommand):
+                self.state = ResponseParser.DONE
+                break
+            record = parseRecord(line)
+            if record is not None:
+                records.append(record)
+        return self.state == ResponseParser.DONE
+
+
+class ErrorsParser(ResponseParser):
+
+    """ Parser of ERRORS Cfserver response."""
+
+    ERROR_TYPES = frozenset(["ERROR", "WARN", "INFO"])
+
+    def __init__(self):
+        """ Create new ErrorsParser."""
+        super().__init__("ERRORS")
+
+    def parseHeader(self, line):
+        """ Parse ERRORS "filename" id into (filename, id)."""
+        fields = ResponseParser.splitFields(line[len(self.command):])
+        if len(fields) < 2 or fields[0] == "" or not fields[1].isdigit():
+            return None
+        return (fields[0], int(fields[1]))
+
+    def parseRecord(self, line):
+        """ Parse type fromOfs toOfs message into ErrorRecord."""
+        parts = line.split(" ", 3)
+        if (len(parts) < 4 or parts[0] not in ErrorsParser.ERROR_TYPES or
+                not parts[1].isdigit() or not parts[2].isdigit()):
+            return None
+        message = parts[3].replace("\r", "")
+        if message == "":
+            return None
+        return ErrorRecord(parts[0], int(parts[1]), int(parts[2]), message)
+
+
+class UsagesParser(ResponseParser):
+
+    """ Parser of USAGES Cfserver response."""
+
+    """ Usage records come in several layouts depending on the command
+        that was issued. All of them start with usage type followed by
+        bare and quoted fields, so layout is described by positions of
+        filename, fromOfs, toOfs and quote among these fields."""
+
+    def __init__(self, layout, fieldCount, hasArgument):
+        """ Create new UsagesParser."""
+        super().__init__("USAGES")
+        self.layout = layout
+        self.fieldCount = fieldCount
+        self.hasArgument = hasArgument
+
+    def parseHeader(self, line):
+        """ Parse USAGES type "name" ["arg"] into (type, name, arg)."""
+        quote = line.find('"')
+        if quote == -1:
+            return None
+        usagesType = line[len(self.command):quote].strip()
+        fields = ResponseParser.splitFields(line[quote:])
+        if usagesType == "" or len(fields) == 0:
+            return None
+        if self.hasArgument:
+            if len(fields) < 2 or fields[1] == "":
+                return None
+            return (usagesType, fields[0], fields[1])
+        return (usagesType, fields[0], None)
+
+    def parseRecord(self, line):
+        """ Parse one usage line into UsageRecord."""
+        quote = line.find('"')
+        if quote <= 0:
+            return None
+        fields = ResponseParser.splitFields(line[quote:])
+        if len(fields) < self.fieldCount:
+            return None
+        (ndxFilename, ndxFrom, ndxTo, ndxQuote) = self.layout
+        fromOfs = fields[ndxFrom]
+        toOfs = fields[ndxTo]
+        if not fromOfs.isdigit() or not toOfs.isdigit():
+            return None
+        return UsageRecord(line[:quote].strip(), fields[ndxFilename],
+                           int(fromOfs), int(toOfs), fields[ndxQuote])
+
+
+class Request:
+
+    """ One request sent to Cfserver, waiting for its reply."""
+
+    PENDING, DONE, SUPERSEDED, TIMED_OUT, CANCELLED, FAILED = range(6)
+
+    def __init__(self, id, replyType, callback, key, deadline, routedById,
+                 tag=None, filename=None):
+        """ Create new Request."""
+
+        """ Tag is command name, which replies of some types repeat
+            after reply type. Filename is file reply is to name, if
+            it names one."""
+        self.id = id
+        self.tag = tag
+        self.filename = filename
+        self.replyType = replyType
+        self.callback = callback
+        self.key = key
+        self.deadline = deadline
+        self.routedById = routedById
+        self.state = Request.PENDING
+        self.staleAfter = None  # when late reply is no longer expected
+        self.reply = None
+        self.doneCallbacks = []
+        self.event = threading.Event()
+
+    def isPending(self):
+        """ Check whether request still waits for its reply."""
+        return self.state == Request.PENDING
+
+    def addDoneCallback(self, callback):
+        """ Call callback(request) once request is finished either way."""
+        self.doneCallbacks.append(callback)
+        if not self.isPending():
+            callback(self)
+
+    def wait(self, timeout=None):
+        """ Block until request is finished, return reply lines or None."""
+        self.event.wait(timeout)
+        return self.reply
+
+    def finish(self, state, reply=None):
+        """ Move request out of PENDING state, return False if it was not there."""
+        if self.state != Request.PENDING:
+            return False
+        self.state = state
+        self.reply = reply
+        self.event.set()
+        return True
+
+
+class RequestRouter:
+
+    """ Correlation of Cfserver replies with requests they answer."""
+
+    """ Replies that echo request id (ERRORS) are routed by id. Other
+        replies are routed to the oldest request waiting for reply of
+        that type, as Cfserver answers commands in order. Superseded,
+        timed out and cancelled requests keep their place in line, so
+        that their late replies are dropped instead of being delivered
+        to whoever asked next. Late reply is dropped only if it names
+        command of finished request ahead of the line; reply naming
+        other command means finished request was never answered, so
+        it leaves the line and reply goes to next request."""
+
+    # Number of seconds a finished request keeps absorbing late replies.
+    STALE_GRACE = 60
+
+    # Minimal number of seconds between sweeps for overdue requests.
+    EXPIRE_INTERVAL = 1
+
+    def __init__(self):
+        """ Create new RequestRouter."""
+        self.lock = threading.Lock()
+        self.byId = {}  # pending requests routed by id
+        self.byType = {}  # reply type -> deque of requests in send order
+        self.byKey = {}  # supersede key -> latest request
+        self.retiredIds = {}  # id -> time until which replies are dropped
+        self.nextExpiry = 0
+
+    @staticmethod
+    def replyHeader(command, lines):
+        """ Extract (filename, id) echoed in reply, None if there is none."""
+        if command == "ERRORS":
+            return ErrorsParser().parseHeader(lines[0])
+        return None
+
+    @staticmethod
+    def replyId(command, lines):
+        """ Extract request id echoed in reply, None if there is none."""
+        header = RequestRouter.replyHeader(command, lines)
+        return header[1] if header is not None else None
+
+    @staticmethod
+    def names(request, filename):
+        """ Check whether reply naming filename may be for request."""
+        if request.filename is None:
+            return True
+        filename = filename.replace("\\\\", "\\")  # escaped in reply
+        return (os.path.normcase(os.path.normpath(filename)) ==
+                os.path.normcase(os.path.normpath(request.filename)))
+
+    @staticmethod
+    def replyTag(lines):
+        """ Extract command name repeated in reply, None if there is none."""
+        words = lines[0].split(None, 2)
+        if len(words) < 2 or words[1].startswith('"'):
+            return None
+        return words[1]
+
+    @staticmethod
+    def answers(request, tag):
+        """ Check whether reply with tag may be answer to request."""
+        return request.tag is None or tag is None or request.tag == tag
+
+    def add(self, request):
+        """ Start tracking new request, superseding previous one with same key."""
+        with self.lock:
+            finished = self.expire()
+            if request.key is not None:
+                previous = self.byKey.get(request.key)
+                if previous is not None and self.retire(
+                        previous, Request.SUPERSEDED):
+                    finished.append(previous)
+                self.byKey[request.key] = request
+            if request.routedById:
+                self.byId[request.id] = request
+            else:
+                self.byType.setdefault(
+                    request.replyType, collections.deque()).append(request)
+        RequestRouter.notify(finished)
+
+    def isPending(self, key):
+        """ Check whether request with given key waits for its reply."""
+        with self.lock:
+            request = self.byKey.get(key)
+            return request is not None and request.isPending()
+
+    def pendingKeys(self, command):
+        """ Retrieve keys (command, ...) of requests waiting for replies."""
+        with self.lock:
+            return [key for (key, request) in self.byKey.items()
+                    if isinstance(key, tuple) and key[0] == command and
+                    request.isPending()]
+
+    def cancel(self, request):
+        """ Give up on request, its reply will be dropped."""
+        with self.lock:
+            cancelled = self.retire(request, Request.CANCELLED)
+        if cancelled:
+            RequestRouter.notify([request])
+
+    def withdraw(self, request):
+        """ Forget request whose command was never sent, mark it failed."""
+        with self.lock:
+            if not request.finish(Request.FAILED):
+                return
+            if self.byKey.get(request.key) is request:
+                del self.byKey[request.key]
+            if request.routedById:
+                self.byId.pop(request.id, None)
+            else:
+                requests = self.byType.get(request.replyType)
+                if requests is not None and request in requests:
+                    requests.remove(request)
+        RequestRouter.notify([request])
+
+    def cancelAll(self):
+        """ Give up on every pending request."""
+        with self.lock:
+            finished = [r for r in self.byId.values() if r.isPending()]
+            for requests in self.byType.values():
+                finished.extend(r for r in requests if r.isPending())
+            for request in finished:
+                request.finish(Request.CANCELLED)
+            self.byId = {}
+            self.byType = {}
+            self.byKey = {}
+        RequestRouter.notify(finished)
+
+    def retire(self, request, state):
+        """ Finish request without reply, remember to drop its reply."""
+        if not request.finish(state):
+            return False
+        request.staleAfter = time.monotonic() + RequestRouter.STALE_GRACE
+        if self.byKey.get(request.key) is request:
+            del self.byKey[request.key]
+        if request.routedById:
+            self.byId.pop(request.id, None)
+            self.retiredIds[request.id] = request.staleAfter
+        return True
+
+    def expireOverdue(self):
+        """ Time out overdue requests right away."""
+        with self.lock:
+            finished = self.expire(force=True)
+        RequestRouter.notify(finished)
+
+    def expire(self, force=False):
+        """ Time out overdue requests, forget long finished ones."""
+
+        """ Unless forced, sweep is done at most once per
+            EXPIRE_INTERVAL, so routing a reply stays O(1)."""
+        now = time.monotonic()
+        if not force and now < self.nextExpiry:
+            return []
+        self.nextExpiry = now + RequestRouter.EXPIRE_INTERVAL
+        finished = []
+        for request in list(self.byId.values()):
+            if request.deadline is not None and request.deadline < now:
+                self.retire(request, Request.TIMED_OUT)
+                finished.append(request)
+        for requests in self.byType.values():
+            for request in requests:
+                if (request.isPending() and request.deadline is not None and
+                        request.deadline < now):
+                    self.retire(request, Request.TIMED_OUT)
+                    finished.append(request)
+            # Server may never answer some of them, don't wait forever.
+            while (requests and not requests[0].isPending() and
+                    requests[0].staleAfter < now):
+                requests.popleft()
+        for id, until in list(self.retiredIds.items()):
+            if until < now:
+                del self.retiredIds[id]
+        return finished
+
+    def route(self, command, lines):
+        """ Deliver reply to its request, tell whether reply was consumed."""
+
+        """ Reply that belongs to no request is not consumed and should
+            go to regular handlers. So is reply to request that has no
+            callback of its own."""
+        with self.lock:
+            finished = self.expire()
+            request = None
+            header = RequestRouter.replyHeader(command, lines)
+            if header is not None:
+                (filename, id) = header
+                request = self.byId.get(id)
+                if request is None:
+                    dropped = id in self.retiredIds
+                elif not RequestRouter.names(request, filename):
+                    request = None  # not what was asked, request still waits
+                    dropped = True
+                else:
+                    del self.byId[id]
+                    dropped = False
+            else:
+                requests = self.byType.get(command)
+                tag = RequestRouter.replyTag(lines)
+                dropped = False
+                while requests and not requests[0].isPending():
+                    if RequestRouter.answers(requests.popleft(), tag):
+                        dropped = True
+                        break
+                if requests and not dropped:
+                    request = requests.popleft()
+            if request is not None:
+                if self.byKey.get(request.key) is request:
+                    del self.byKey[request.key]
+                request.finish(Request.DONE, lines)
+                finished.append(request)
+        RequestRouter.notify(finished)
+        if dropped:
+            print("Cfserver: dropped stale %s reply" % (command))
+            return True
+        if request is None or request.callback is None:
+            return False
+        request.callback(lines)
+        return True
+
+    @staticmethod
+    def notify(requests):
+        """ Run done callbacks of finished requests."""
+        for request in requests:
+            for callback in request.doneCallbacks:
+                callback(request)
+
+
+class CommandWriter:
+
+    """ Writer of commands to Cfserver stdin."""
+
+    """ Callers only put commands into bounded queue and never block,
+        even when pipe is full because Cfserver is busy. Dedicated
+        thread writes commands queued back to back (module, reload,
+        analyze) with single write and flush."""
+
+    MAX_QUEUED = 1024
+
+    def __init__(self, stdin):
+        """ Create new CommandWriter and start its thread."""
+        self.stdin = stdin
+        self.commands = queue.Queue(CommandWriter.MAX_QUEUED)
+        self.dropped = 0
+        self.isClosing = False
+        self.isClosed = False
+        self.writerThread = threading.Thread(target=self.write)
+        self.writerThread.start()
+
+    def send(self, text):
+        """ Queue text for writing, return False if it can't be written."""
+        if self.isClosed:
+            return False
+        try:
+            self.commands.put(text, block=False)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print("Cfserver: command queue is full, dropped %s" % (text))
+            return False
+
+    def depth(self):
+        """ Retrieve number of commands waiting to be written."""
+        return self.commands.qsize()
+
+    def close(self):
+        """ Stop writer thread once queued commands are written."""
+        self.isClosing = True
+        try:
+            self.commands.put(None, block=False)
+        except queue.Full:
+            pass  # writer checks isClosing after draining the queue
+
+    def write(self):
+        """ Continuously write queued commands."""
+        commands = self.commands
+        while True:
+            batch = [commands.get(block=True)]
+            while True:
+                try:
+                    batch.append(commands.get(block=False))
+                except queue.Empty:
+                    break
+            isClosed = None in batch
+            if isClosed:
+                batch = batch[:batch.index(None)]
+            try:
+                self.stdin.write(bytes("".join(batch), "utf-8", "replace"))
+                self.stdin.flush()
+            except (OSError, ValueError):
+                break  # Cfserver is gone, daemon will restart it
+            if isClosed or (self.isClosing and commands.empty()):
+                break
+        self.isClosed = True
+
+
+class ProtocolRecorder:
+
+    """ Append-only recording of traffic between plugin and Cfserver."""
+
+    """ Every command sent is one line "S <time> <id> <command>", every
+        reply received is "R <time> <id> <number of lines>" followed by
+        lines of reply. Time is number of seconds since session started,
+        id is request id or "-" if there is none. Every Cfserver started
+        anew, with ids of its own, is new session, which starts with
+        line "N <seconds since epoch>"."""
+
+    HEADER = "# cfserver protocol recording 2"
+
+    def __init__(self, path):
+        """ Start new session of recording in path."""
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.file = open(path, "a", encoding="utf-8", newline="\n")
+        if self.file.tell() == 0:
+            self.file.write(ProtocolRecorder.HEADER + "\n")
+        self.file.write("N %.6f\n" % (time.time()))
+        self.file.flush()
+
+    def recordCommand(self, id, command):
+        """ Record command being sent."""
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write("S %.6f %s %s\n" % (
+                time.monotonic() - self.started,
+                "-" if id is None else id, command))
+            self.file.flush()
+
+    def recordReply(self, id, lines):
+        """ Record reply being received."""
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write("R %.6f %s %d\n%s\n" % (
+                time.monotonic() - self.started,
+                "-" if id is None else id, len(lines), "\n".join(lines)))
+            self.file.flush()
+
+    def close(self):
+        """ Stop recording."""
+        with self.lock:
+            self.file.close()
+
+
+class ProtocolReplayer:
+
+    """ Replay of recorded Cfserver replies through plugin handlers."""
+
+    """ Recorded commands register requests, so that replies are routed
+        the same way they were in recorded session, and recorded replies
+        are fed to OutputCollector. Replay goes at recorded pace scaled
+        by speed, or as fast as possible if speed is 0. Sessions are
+        replayed one after another: times of a session continue from
+        the end of the one before it, and requests left waiting by it
+        are cancelled, as ids start over."""
+
+    def __init__(self, path):
+        """ Load recording from path."""
+        self.events = []  # (kind, time, id, command or reply lines)
+        offset = 0.0  # end of previous sessions
+        at = 0.0
+        with open(path, encoding="utf-8", newline="\n") as f:
+            lines = iter(f.read().split("\n"))
+        for line in lines:
+            if line == "" or line.startswith("#"):
+                continue
+            if line.split(" ", 1)[0] == "N":
+                if self.events:
+                    offset = at
+                    self.events.append(("N", at, None, None))
+                continue
+            (kind, at, id, rest) = (line.split(" ", 3) + [""])[:4]
+            at = offset + float(at)
+            id = None if id == "-" else int(id)
+            if kind == "S":
+                self.events.append((kind, at, id, rest))
+            elif kind == "R":
+                reply = [next(lines) for _ in range(int(rest))]
+                self.events.append((kind, at, id, reply))
+
+    @staticmethod
+    def handlerFor(command):
+        """ Create handler for reply to command, None if it has none."""
+        word = OutputCollector.firstWord(command)
+        if word in ("goto-def", "find-usages", "find-declarators",
+                    "find-parents", "find-inheritors"):
+            return UsagesHandler()
+        if word == "find-files":
+            return UsagesFileNamesHandler()
+        if word == "find-strings":
+            return UsagesStringsNamesHandler()
+        if word in ("find-names", "find-macros", "find-names-in-file"):
+            return UsagesNamesHandler()
+        return None
+
+    def replay(self, outputCollector, speed=0):
+        """ Feed recording to outputCollector, return per reply timings."""
+
+        """ Timings are (reply, seconds it took to handle) tuples."""
+        router = outputCollector.router
+        started = time.monotonic()
+        timings = []
+        for (kind, at, id, payload) in self.events:
+            if speed > 0:
+                delay = started + at / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == "N":
+                if router is not None:
+                    router.cancelAll()
+            elif kind == "S":
+                handler = ProtocolReplayer.handlerFor(payload)
+                if router is not None and id is not None:
+                    if payload.startswith("analyze "):
+                        router.add(Request(
+                            id, "ERRORS", None, None, None, True))
+                    elif handler is not None:
+                        router.add(Request(
+                            id, handler.type, handler.proc, None, None,
+                            False, OutputCollector.firstWord(payload)))
+            else:
+                handled = time.perf_counter()
+                outputCollector.feed(
+                    bytes("\n".join(payload) + "\n", "utf-8"))
+                timings.append((payload, time.perf_counter() - handled))
+        return timings
+
+
+class Daemon:
+
+    """ Class responsible for starting/stopping Cfserver executable."""
+
+    # Cfserver that ran this many seconds before exiting did not crash
+    # on startup, so restarting it right away is fine.
+    STABLE_UPTIME = 60
+
+    # Maximal number of seconds to wait before restarting crashed Cfserver.
+    MAX_BACKOFF = 64
+
+    # Number of seconds stopped Cfserver is given to exit before it is killed.
+    STOP_TIMEOUT = 5
+
+    def __init__(self, cmd, in_log, out_log, recorder=None):
+        """ Initialize new Daemon."""
+        self.ids = itertools.count(1)
+        self.recorder = recorder
+        self.lock = threading.RLock()
+        self.proc = None
+        self.router = None
+        self.outputCollector = None
+        self.writer = None
+        self.handlers = []
+        self.registeredFiles = set()
+        self.crashes = 0
+        self.restartAt = None
+        self.start(cmd, in_log, out_log)
+
+    def getNextUniqueId(self):
+        """ Generate unique id to be used for new Cfserver request."""
+
+        """ Requests are made on several threads; taking next value of
+            itertools.count is atomic, unlike incrementing attribute."""
+        return next(self.ids)
+
+    def start(self, cmd, in_log, out_log):
+        """ Start new Cfserver executable."""
+        startupinfo = None
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        command_line = [cmd, '--codeblocks', '--disable-cancel']
+        if in_log is not None and in_log != '':
+            command_line += ['--inLogName', in_log]
+        if out_log is not None and out_log != '':
+            command_line += ['--outLogName', out_log]
+
+        print("Starting %s" % (command_line))
+        self.startedAt = time.monotonic()
+
+        self.proc = subprocess.Popen(
+            command_line,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,
+            startupinfo=startupinfo)
+
+        self.router = RequestRouter()
+        self.outputCollector = OutputCollector(
+            self.proc.stdout, self.router, self.recorder)
+        for handler in self.handlers:
+            self.outputCollector.addHandler(handler)
+        self.writer = CommandWriter(self.proc.stdin)
+
+        print("Started cfserver proc pid=%d" % (self.proc.pid))
+
+        self.writer.send(
+            r'''#
+begin-config cmode
+gcc
+end-config
+begin-config cppmode
+g++
+end-config
+option +deCR_on
+''')
+
+    def restartIfInactive(self, cmd, in_log, out_log):
+        """ Restart process if it exited, tell whether it was restarted."""
+
+        """ Cfserver that keeps crashing soon after start is restarted
+            with exponential backoff. Restarted Cfserver gets all
+            modules registered so far, and whatever was waiting for
+            replies from previous one is cancelled."""
+        with self.lock:
+            if self.proc.poll() is None:
+                return False
+            now = time.monotonic()
+            if self.restartAt is None:  # just noticed it has exited
+                if now - self.startedAt < Daemon.STABLE_UPTIME:
+                    self.crashes += 1
+                else:
+                    self.crashes = 0
+                delay = (0 if self.crashes == 0 else
+                         min(Daemon.MAX_BACKOFF, 2 ** (self.crashes - 1)))
+                self.restartAt = now + delay
+                print("Cfserver pid=%d exited with %s, restarting in %d s" % (
+                    self.proc.pid, self.proc.returncode, delay))
+            if now < self.restartAt:
+                return False
+            self.restartAt = None
+
+            previous = (self.proc, self.router, self.outputCollector,
+                        self.writer)
+            self.start(cmd, in_log, out_log)
+            self.replayModules()
+        (proc, router, outputCollector, writer) = previous
+        router.cancelAll()
+        writer.close()
+        outputCollector.close()
+        threading.Thread(target=Daemon.reap, args=(proc, writer)).start()
+        return True
+
+    @staticmethod
+    def moduleCommand(filename):
+        """ Build command registering module, None for header files."""
+        if is_header(filename):
+            return None
+        basename = os.path.basename(filename)
+        return "module \"%s\" %s" % (
+            filename.replace("\\", "\\\\"),
+            "cmode" if basename.endswith(".c") else "cppmode")
+
+    def replayModules(self):
+        """ Register all known modules with Cfserver in one batch."""
+        self.sendModuleCommands(sorted(self.registeredFiles))
+
+    def registerModules(self, filenames):
+        """ Register files not registered yet with Cfserver in one batch."""
+        filenames = [filename for filename in filenames
+                     if not self.isFileRegistered(filename)]
+        for filename in filenames:
+            self.registerFile(filename)
+        self.sendModuleCommands(filenames)
+
+    def sendModuleCommands(self, filenames):
+        """ Send module commands for filenames in one batch."""
+        commands = [Daemon.moduleCommand(filename) for filename in filenames]
+        commands = [command for command in commands if command is not None]
+        if commands:
+            print(">> %d module commands" % (len(commands)))
+            self.writer.send("".join(
+                "%s%s" % (command, os.linesep) for command in commands))
+
+    def addHandler(self, handler):
+        """ Add Cfserver output handler that survives restarts."""
+        self.handlers.append(handler)
+        self.outputCollector.addHandler(handler)
+
+    def sendCommand(self, command, id=None):
+        """ Send new command to Cfserver executable, tell whether it was."""
+        print(">> %s" % (command))
+        if not self.writer.send("%s%s" % (command, os.linesep)):
+            return False
+        if self.recorder is not None:
+            self.recorder.recordCommand(id, command)
+        return True
+
+    def queueDepth(self):
+        """ Retrieve number of commands not yet written to Cfserver."""
+        return self.writer.depth()
+
+    def request(self, command, replyType, callback=None, key=None,
+                timeout=None, id=None, filename=None):
+        """ Send command and route its reply to callback."""
+
+        """ Pass id if command makes Cfserver echo it in the reply, and
+            filename if reply names file too; reply with that id naming
+            other file is dropped. Request with the same key as an
+            earlier one supersedes it. Callback is called with reply
+            lines on Cfserver output thread; without callback reply goes
+            to regular handlers."""
+        routedById = id is not None
+        if not routedById:
+            id = self.getNextUniqueId()
+        request = Request(
+            id, replyType, callback, key,
+            time.monotonic() + timeout if timeout is not None else None,
+            routedById, OutputCollector.firstWord(command), filename)
+        self.router.add(request)
+        if not self.sendCommand(command, id):
+            # reply will never come, nor is it to take place of another
+            self.router.withdraw(request)
+            return request
+        if timeout is not None:
+            # time out even if Cfserver goes quiet
+            set_timeout_async(
+                self.router.expireOverdue, int(timeout * 1000) + 1)
+        return request
+
+    def stop(self):
+        """ Stop Cfserver executable."""
+        self.router.cancelAll()
+        self.writer.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+        self.outputCollector.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        threading.Thread(target=Daemon.reap,
+                         args=(self.proc, self.writer)).start()
+
+    @staticmethod
+    def reap(proc, writer):
+        """ Wait for Cfserver to exit, kill it if it does not."""
+
+        """ Runs on its own thread so that stopping never blocks UI.
+            Stdin is closed only once writer thread is done with it."""
+        try:
+            proc.wait(Daemon.STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            print("Cfserver pid=%d did not exit, killing it" % (proc.pid))
+            proc.kill()
+            proc.wait()
+        writer.writerThread.join(Daemon.STOP_TIMEOUT)
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+    def memoryUsage(self):
+        """ Retrieve resident memory of Cfserver in bytes, None if unknown."""
+        try:
+            with open("/proc/%d/statm" % (self.proc.pid)) as statm:
+                pages = int(statm.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError, AttributeError):
+            return None
+
+    def isFileRegistered(self, filename):
+        """ Check whether we have registered this file already."""
+        return filename in self.registeredFiles
+
+    def isRunning(self):
+        """ Check whether Cfserver process is running."""
+        return self.proc.poll() is None
+
+    def registerFile(self, filename):
+        """ Register new file with Cfserver."""
+        self.registeredFiles.add(filename)
+
+    def unregisterFile(self, filename):
+        """ Forget file registered with Cfserver."""
+
+        """ Replies are handled on reader thread, while restart replays
+            registered files under lock."""
+        with self.lock:
+            self.registeredFiles.discard(filename)
+
+
+class IntervalIndex:
+
+    """ Index answering which intervals cover given offset."""
+
+    """ This is implicit augmented interval tree. Intervals are sorted
+        by start in flat arrays, which are treated as complete binary
+        tree: elements with even index are leaves, and element with
+        index i at level k has children i -/+ 2^(k-1). Every element
+        knows the largest end within its subtree, so query visits only
+        subtrees that may have hits, taking O(log n + k) time."""
+
+    # Subtrees at or below this level are scanned linearly.
+    SCAN_LEVEL = 3
+
+    def __init__(self, intervals):
+        """ Build index of (start, end, value) tuples, end included."""
+        intervals = sorted(intervals, key=lambda i: i[0])
+        self.starts = array.array('q', (i[0] for i in intervals))
+        self.ends = array.array('q', (i[1] for i in intervals))
+        self.values = [i[2] for i in intervals]
+        self.maxEnds = array.array('q', self.ends)
+        self.maxLevel = self.build()
+
+    def build(self):
+        """ Compute largest ends of subtrees, return level of root."""
+        n = len(self.starts)
+        if n == 0:
+            return -1
+        ends = self.ends
+        maxEnds = self.maxEnds
+        lastNdx = (n - 1) & ~1  # rightmost leaf
+        last = maxEnds[lastNdx]  # largest end of rightmost subtree
+        k = 1
+        while 1 << k <= n:
+            half = 1 << (k - 1)
+            for i in range((half << 1) - 1, n, half << 2):
+                endLeft = maxEnds[i - half]
+                endRight = maxEnds[i + half] if i + half < n else last
+                maxEnds[i] = max(ends[i], endLeft, endRight)
+            lastNdx += -half if (lastNdx >> k) & 1 else half
+            if lastNdx < n and maxEnds[lastNdx] > last:
+                last = maxEnds[lastNdx]
+            k += 1
+        return k - 1
+
+    def covering(self, offset, last=None):
+        """ Retrieve values of intervals covering offset, by their start."""
+
+        """ With last given, intervals covering any offset between offset
+            and last are retrieved."""
+        if last is None:
+            last = offset
+        hits = []
+        if self.maxLevel < 0:
+            return hits
+        n = len(self.starts)
+        starts = self.starts
+        ends = self.ends
+        maxEnds = self.maxEnds
+        stack = [(self.maxLevel, (1 << self.maxLevel) - 1, False)]
+        while stack:
+            (k, i, leftDone) = stack.pop()
+            if k <= IntervalIndex.SCAN_LEVEL:
+                first = i >> k << k
+                for j in range(first, min(first + (1 << (k + 1)) - 1, n)):
+                    if starts[j] > last:
+                        break
+                    if ends[j] >= offset:
+                        hits.append(j)
+            elif not leftDone:
+                left = i - (1 << (k - 1))
+                stack.append((k, i, True))
+                if left >= n or maxEnds[left] >= offset:
+                    stack.append((k - 1, left, False))
+            elif i < n and starts[i] <= last:
+                if ends[i] >= offset:
+                    hits.append(i)
+                stack.append((k - 1, i + (1 << (k - 1)), False))
+        return [self.values[j] for j in hits]
+
+
+class OffsetIndex:
+
+    """ Translation between Cfserver byte offsets and character offsets."""
+
+    """ Cfserver counts UTF-8 bytes, Sublime counts characters. Both
+        count one per line end: Daemon starts Cfserver with option
+        +deCR_on, which makes it skip CR of CR/LF line ends, as Sublime
+        does. Byte offset of every CHECKPOINT-th character is
+        remembered, so that translation is bisection of checkpoints
+        followed by walk over at most CHECKPOINT characters. ASCII text
+        is translated as is."""
+
+    CHECKPOINT = 128
+
+    def __init__(self, text):
+        """ Create index of text."""
+        self.text = text
+        self.checkpoints = array.array("q", [0])
+        self.isIdentity = len(text.encode("utf-8")) == len(text)
+        if self.isIdentity:
+            return
+        total = 0
+        step = OffsetIndex.CHECKPOINT
+        for start in range(0, len(text), step):
+            total += len(text[start:start + step].encode("utf-8"))
+            self.checkpoints.append(total)
+
+    def charOffset(self, byteOffset):
+        """ Translate byte offset to offset of character it falls in."""
+        if self.isIdentity:
+            return max(0, min(byteOffset, len(self.text)))
+        step = OffsetIndex.CHECKPOINT
+        k = bisect.bisect_right(self.checkpoints, byteOffset) - 1
+        char = k * step
+        pos = self.checkpoints[k]
+        for ch in self.text[char:char + step]:
+            if ch < "\x80":
+                size = 1
+            elif ch < "\u0800":
+                size = 2
+            elif ch < "\U00010000":
+                size = 3
+            else:
+                size = 4
+            if pos + size > byteOffset:
+                break
+            pos += size
+            char += 1
+        return max(0, min(char, len(self.text)))
+
+    def byteOffset(self, charOffset):
+        """ Translate character offset to byte offset."""
+        if self.isIdentity:
+            return charOffset
+        charOffset = max(0, min(charOffset, len(self.text)))
+        k = charOffset // OffsetIndex.CHECKPOINT
+        chunk = self.text[k * OffsetIndex.CHECKPOINT:charOffset]
+        return self.checkpoints[k] + len(chunk.encode("utf-8"))
+
+
+class ErrorsInFile:
+
+    """ Holder of all errors/warnings in particular file."""
+
+    """ Edits made to file since it was analyzed are kept as shift map,
+        a list of (start, oldEnd, newEnd) replacements in order they
+        were made. Lookups map offsets through it, and once it grows
+        long enough it is folded into records. Errors overlapping text
+        that was replaced are gone. Records as reported are kept aside,
+        for text to get them back once edits are undone."""
+
+    # Number of edits remembered before they are folded into records.
+    MAX_EDITS = 64
+
+    def __init__(self, records):
+        """ Initialize holder with ErrorRecords reported by Cfserver."""
+        self.lock = threading.Lock()
+        self.records = records
+        self.reported = records
+        self.edits = []
+        self.index = IntervalIndex((r.fromOfs, r.toOfs, r) for r in records)
+
+    def messagesAt(self, offset):
+        """ Retrieve messages of errors covering offset."""
+        with self.lock:
+            edits = self.edits
+            # Where text was deleted, offset used to be anywhere between
+            # first and last, except in text inserted since.
+            (first, last) = (offset, offset)
+            for (start, oldEnd, newEnd) in reversed(edits):
+                if start < first < newEnd:
+                    first = newEnd
+                if start < last < newEnd:
+                    last = start
+                if first > last:
+                    return []  # offset is in new text
+                if first > start:
+                    first += oldEnd - newEnd
+                if last >= newEnd:
+                    last += oldEnd - newEnd
+            messages = []
+            for record in self.index.covering(first, last):
+                span = ErrorsInFile.shift(record.fromOfs, record.toOfs, edits)
+                if span is not None and span[0] <= offset <= span[1]:
+                    messages.append(record.message)
+            return messages
+
+    @staticmethod
+    def shift(fromOfs, toOfs, edits):
+        """ Map span through edits, None if edits touched it."""
+        for (start, oldEnd, newEnd) in edits:
+            if oldEnd <= fromOfs:  # edit is before span
+                fromOfs += newEnd - oldEnd
+                toOfs += newEnd - oldEnd
+            elif start < toOfs:  # edit is not after span either
+                return None
+        return (fromOfs, toOfs)
+
+    def edit(self, start, oldEnd, newEnd):
+        """ Account text between start and oldEnd replaced up to newEnd."""
+        with self.lock:
+            self.edits.append((start, oldEnd, newEnd))
+            if len(self.edits) >= ErrorsInFile.MAX_EDITS:
+                self.fold()
+
+    def isEdited(self):
+        """ Check whether records were moved by edits since reported."""
+        with self.lock:
+            return bool(self.edits) or self.records is not self.reported
+
+    def currentRecords(self):
+        """ Retrieve records moved to where they are in edited text."""
+        with self.lock:
+            if self.edits:
+                self.fold()
+            return self.records
+
+    def fold(self):
+        """ Apply edits to records, dropping ones edits touched."""
+
+        """ Lock must be held."""
+        records = []
+        for record in self.records:
+            span = ErrorsInFile.shift(record.fromOfs, record.toOfs, self.edits)
+            if span is not None:
+                records.append(record._replace(fromOfs=span[0], toOfs=span[1]))
+        self.records = records
+        self.index = IntervalIndex((r.fromOfs, r.toOfs, r) for r in records)
+        self.edits = []
+
+    # Rough number of bytes taken by one record on top of its message.
+    RECORD_OVERHEAD = 200
+
+    def size(self):
+        """ Estimate number of bytes taken by this holder."""
+        return sum(ErrorsInFile.RECORD_OVERHEAD + len(r.message)
+                   for r in self.records)
+
+
+class DiagnosticsCache:
+
+    """ Errors/warnings of recently analyzed files."""
+
+    """ Entries are keyed by file name and remember hash of the content
+        they were reported for, so that unchanged file gets its errors
+        back without asking Cfserver. Least recently used entries are
+        evicted once all of them together exceed byte budget."""
+
+    # Number of bytes of diagnostics kept unless settings say otherwise.
+    DEFAULT_BUDGET = 16 * 1024 * 1024
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        """ Create cache holding about budget bytes of diagnostics."""
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # filename -> entry
+        self.total = 0
+
+    def setBudget(self, budget):
+        """ Change byte budget, evict entries above it."""
+        with self.lock:
+            self.budget = budget
+            self.evictLocked()
+
+    # Hashes of views, computed once per version of view.
+    contentKeys = {}  # view id -> (change count, hash)
+    contentKeysLock = threading.Lock()
+
+    @staticmethod
+    def contentKey(view):
+        """ Compute hash of text in view."""
+
+        """ Hash is computed once per change count of view, so call it
+            off UI thread first if view may be big."""
+        changeCount = view.change_count()
+        with DiagnosticsCache.contentKeysLock:
+            entry = DiagnosticsCache.contentKeys.get(view.id())
+        if entry is not None and entry[0] == changeCount:
+            return entry[1]
+        text = view.substr(sublime.Region(0, view.size()))
+        key = zlib.crc32(text.encode("utf-8"))
+        with DiagnosticsCache.contentKeysLock:
+            DiagnosticsCache.contentKeys[view.id()] = (changeCount, key)
+        return key
+
+    @staticmethod
+    def forgetView(view):
+        """ Forget hash of closed view."""
+        with DiagnosticsCache.contentKeysLock:
+            DiagnosticsCache.contentKeys.pop(view.id(), None)
+
+    def put(self, filename, contentKey, errors):
+        """ Remember errors reported for given content of filename."""
+        size = errors.size()
+        with self.lock:
+            self.discardLocked(filename)
+            self.entries[filename] = (contentKey, errors, size)
+            self.total += size
+            self.evictLocked()
+
+    def evictLocked(self):
+        """ Evict least recently used entries above budget, lock is held."""
+        while self.total > self.budget and len(self.entries) > 1:
+            self.discardLocked(next(iter(self.entries)))
+
+    def get(self, filename, contentKey):
+        """ Retrieve errors if they were reported for given content."""
+
+        """ Errors that followed edits since are replaced with ones as
+            reported, as content is back to what was analyzed."""
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is None or entry[0] != contentKey:
+                return None
+            errors = entry[1]
+            if errors.isEdited():
+                errors = ErrorsInFile(errors.reported)
+                self.entries[filename] = (contentKey, errors, entry[2])
+            self.entries.move_to_end(filename)
+            return errors
+
+    def filenames(self):
+        """ List files errors are kept for."""
+        with self.lock:
+            return list(self.entries)
+
+    def peek(self, filename):
+        """ Retrieve latest errors reported for filename, if any."""
+        entry = self.entries.get(filename)
+        return entry[1] if entry is not None else None
+
+    def discard(self, filename):
+        """ Forget errors reported for filename."""
+        with self.lock:
+            self.discardLocked(filename)
+
+    def discardLocked(self, filename):
+        """ Forget errors reported for filename, lock is being held."""
+        entry = self.entries.pop(filename, None)
+        if entry is not None:
+            self.total -= entry[2]
+
+
+class DaemonPool:
+
+    """ Cfserver daemons, one per project."""
+
+    """ Daemons are keyed by project root and settings they were started
+        with. Every daemon has its own analysis queue, symbol universe
+        and set of registered files. Daemons not used for a while, or
+        taking too much memory, are stopped; they get started again on
+        next request."""
+
+    # Number of seconds between checks of daemons memory usage.
+    MEMORY_CHECK_INTERVAL = 60
+
+    def __init__(self):
+        """ Create empty DaemonPool."""
+        self.lock = threading.Lock()
+        self.daemons = {}  # key -> Daemon
+        self.lastUsed = {}  # key -> time daemon was last asked for
+        self.nextMemoryCheck = 0
+
+    @staticmethod
+    def logName(log, root):
+        """ Make log file name unique to project."""
+        if log is None or log == "" or root == "":
+            return log
+        return "%s-%s" % (log, os.path.basename(os.path.normpath(root)))
+
+    def get(self, key, create):
+        """ Retrieve daemon for key, tell whether it was just created."""
+        with self.lock:
+            self.lastUsed[key] = time.monotonic()
+            daemon = self.daemons.get(key)
+            if daemon is None:
+                daemon = create()
+                self.daemons[key] = daemon
+                return (daemon, True)
+        return (daemon, False)
+
+    def evictIdle(self, idleTimeout, memoryLimit):
+        """ Stop daemons idle for idleTimeout seconds or above memoryLimit bytes."""
+        now = time.monotonic()
+        evicted = []
+        with self.lock:
+            checkMemory = memoryLimit > 0 and now >= self.nextMemoryCheck
+            if checkMemory:
+                self.nextMemoryCheck = now + DaemonPool.MEMORY_CHECK_INTERVAL
+            for key, daemon in list(self.daemons.items()):
+                isIdle = (idleTimeout > 0 and
+                          self.lastUsed[key] + idleTimeout < now)
+                if not isIdle and checkMemory:
+                    memory = daemon.memoryUsage()
+                    isIdle = memory is not None and memory > memoryLimit
+                if isIdle:
+                    del self.daemons[key]
+                    del self.lastUsed[key]
+                    evicted.append(daemon)
+        for daemon in evicted:
+            print("Cfserver: stopping daemon pid=%d" % (daemon.proc.pid))
+            daemon.stop()
+
+    def stopAll(self):
+        """ Stop every daemon."""
+        with self.lock:
+            daemons = list(self.daemons.values())
+            self.daemons = {}
+            self.lastUsed = {}
+        for daemon in daemons:
+            daemon.stop()
+
+
+class EditTracker:
+
+    """ Tracker of edits made to views."""
+
+    """ Sublime Text 3 does not tell what was changed, so edit is
+        inferred from selection before it, caret after it and change of
+        text size. That covers typing, deleting and pasting with single
+        caret. Any other edit (several carets, indentation, undo) is
+        taken to have replaced lines selection was on before or is on
+        after it."""
+
+    def __init__(self):
+        """ Create new EditTracker."""
+        # view id -> (size, (begin, end) of single selection or None,
+        #             (begin, end) spanning all selections)
+        self.views = {}
+
+    def track(self, view):
+        """ Remember size and selection of view."""
+        selection = view.sel()
+        region = selection[0] if len(selection) == 1 else None
+        if len(selection):
+            span = (min(r.begin() for r in selection),
+                    max(r.end() for r in selection))
+        else:
+            span = (0, view.size())  # any edit may be anywhere
+        self.views[view.id()] = (
+            view.size(),
+            (region.begin(), region.end()) if region is not None else None,
+            span)
+
+    def forget(self, view):
+        """ Stop tracking view."""
+        self.views.pop(view.id(), None)
+
+    def edit(self, view):
+        """ Infer (start, oldEnd, newEnd) of edit just made."""
+
+        """ Returns None if view was not tracked."""
+        previous = self.views.get(view.id())
+        self.track(view)
+        if previous is None:
+            return None
+        (size, single, span) = previous
+        delta = view.size() - size
+        selection = view.sel()
+        if (single is not None and len(selection) == 1 and
+                selection[0].empty()):
+            edit = EditTracker.inferEdit(
+                single[0], single[1], selection[0].begin(), delta)
+            if edit is not None:
+                return edit
+        return EditTracker.dirtyLines(view, span, delta)
+
+    @staticmethod
+    def dirtyLines(view, span, delta):
+        """ Bound edit by lines selection was on before it or is on now."""
+
+        """ Span of selections before edit is in offsets of old text,
+            which are the same in new text up to the edit, and shifted
+            by delta past it."""
+        (start, end) = span
+        newEnd = end + delta
+        for region in view.sel():
+            start = min(start, region.begin())
+            newEnd = max(newEnd, region.end())
+        start = view.line(start).begin()
+        newEnd = view.line(min(newEnd, view.size())).end()
+        return (start, max(start, newEnd - delta), newEnd)
+
+    @staticmethod
+    def inferEdit(begin, end, caret, delta):
+        """ Infer edit from selection before it, caret after it and delta."""
+        if begin == end and delta < 0:
+            if caret == begin + delta:  # backspace
+                return (caret, begin, caret)
+            if caret == begin:  # delete
+                return (begin, begin - delta, begin)
+            return None
+        newEnd = end + delta
+        if (begin == end and delta == 0) or not begin <= caret <= newEnd:
+            return None
+        return (begin, end, newEnd)
+
+
+class AnalysisScheduler:
+
+    """ Coalescing scheduler of module analysis."""
+
+    """ Every file has at most one analysis waiting to be sent and one
+        in flight. Requests coming in a burst (tab cycling, save all)
+        are debounced, then sent one at a time, focused view first,
+        other visible views next and background views last. Views that
+        were only activated in passing and are no longer visible are
+        not analyzed at all."""
+
+    FOCUSED, VISIBLE, BACKGROUND = range(3)
+
+    # Number of analyses every cfserver is asked to do at the same time.
+    MAX_IN_FLIGHT = 1
+
+    def __init__(self):
+        """ Create new AnalysisScheduler."""
+        self.lock = threading.Lock()
+        self.pending = collections.OrderedDict()  # filename -> (view, force)
+        # filename -> (request, time it was sent, change count sent)
+        self.inFlight = {}
+        self.inFlightViews = {}  # filename -> view being analyzed
+        self.analyzed = {}  # filename -> change count of analyzed view
+        self.generation = 0
+
+    def schedule(self, view, force=False, delay=None):
+        """ Ask for analysis of view, skip it if view was not changed."""
+        filename = view.file_name()
+        if delay is None:
+            delay = Cfserver.analysisDelay()
+        with self.lock:
+            if not force and self.isAnalyzed(view):
+                return
+            if filename in self.pending:
+                force = force or self.pending[filename][1]
+            self.pending[filename] = (view, force)
+            self.generation += 1
+            generation = self.generation
+        sublime.set_timeout_async(lambda: self.flush(generation), delay)
+
+    def isAnalyzed(self, view):
+        """ Check whether view content was analyzed already or is being so."""
+        filename = view.file_name()
+        changeCount = view.change_count()
+        inFlight = self.inFlight.get(filename)
+        return (self.analyzed.get(filename) == changeCount or
+                (inFlight is not None and inFlight[2] == changeCount))
+
+    def markAnalyzed(self, view):
+        """ Remember that diagnostics for view content are known."""
+        with self.lock:
+            self.analyzed[view.file_name()] = view.change_count()
+
+    def hasWork(self, daemonKey):
+        """ Check whether analysis in project is waiting or in flight."""
+        with self.lock:
+            views = ([view for (view, force) in self.pending.values()] +
+                     list(self.inFlightViews.values()))
+        return any(Cfserver.daemonKey(view) == daemonKey for view in views)
+
+    def flush(self, generation):
+        """ Send pending analyses once burst of requests is over."""
+        if generation == self.generation:
+            self.pump()
+
+    @staticmethod
+    def priority(view, activeViews):
+        """ Rank view by how much user is looking at it."""
+        if view.id() == activeViews[0]:
+            return AnalysisScheduler.FOCUSED
+        if view.id() in activeViews:
+            return AnalysisScheduler.VISIBLE
+        return AnalysisScheduler.BACKGROUND
+
+    @staticmethod
+    def activeViews():
+        """ Collect ids of focused view followed by other visible ones."""
+        ids = []
+        window = sublime.active_window()
+        if window is not None:
+            view = window.active_view()
+            ids.append(view.id() if view is not None else None)
+        for window in sublime.windows():
+            for group in range(window.num_groups()):
+                view = window.active_view_in_group(group)
+                if view is not None:
+                    ids.append(view.id())
+        return ids if ids else [None]
+
+    def pump(self):
+        """ Send most important pending analyses while there is room."""
+        activeViews = AnalysisScheduler.activeViews()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                timeout = Cfserver.requestTimeout()
+                for filename, (request, sent, _) in list(
+                        self.inFlight.items()):
+                    # Reply may still come, but don't hold the line for it.
+                    if ((request is not None and not request.isPending()) or
+                            sent + timeout < now):
+                        del self.inFlight[filename]
+                        self.inFlightViews.pop(filename, None)
+                busy = collections.Counter(
+                    Cfserver.daemonKey(view)
+                    for view in self.inFlightViews.values())
+                candidates = []
+                for ndx, (filename, (view, force)) in enumerate(
+                        list(self.pending.items())):
+                    priority = AnalysisScheduler.priority(view, activeViews)
+                    if priority == AnalysisScheduler.BACKGROUND and not force:
+                        del self.pending[filename]
+                    elif (filename not in self.inFlight and
+                            busy[Cfserver.daemonKey(view)] <
+                            AnalysisScheduler.MAX_IN_FLIGHT):
+                        candidates.append((priority, ndx, filename))
+                if not candidates:
+                    return
+                filename = min(candidates)[2]
+                view = self.pending.pop(filename)[0]
+                if view.file_name() != filename:
+                    continue  # view was closed or renamed
+                changeCount = view.change_count()
+                # reserve the slot
+                self.inFlight[filename] = (None, now, changeCount)
+                self.inFlightViews[filename] = view
+            request = Cfserver.analyzeModule(view)
+            with self.lock:
+                if filename in self.inFlight:
+                    self.inFlight[filename] = (request, now, changeCount)
+            request.addDoneCallback(
+                lambda request, filename=filename, changeCount=changeCount:
+                self.finished(filename, changeCount, request))
+
+    def finished(self, filename, changeCount, request):
+        """ Note analysis is over, send next one."""
+
+        """ Only analysis that got its reply counts, one that timed
+            out, was superseded or cancelled is sent again next time
+            view is activated."""
+        if request.state == Request.DONE:
+            with self.lock:
+                self.analyzed[filename] = changeCount
+        self.pump()
+
+
+UsagesKey = collections.namedtuple(
+    "UsagesKey", ["command", "daemonKey", "generation", "filename",
+                  "changeCount", "fromOfs", "toOfs"])
+
+
+class UsagesCache:
+
+    """ Results of recent find commands."""
+
+    """ Entries are keyed by find command, identifier it was asked for
+        in given version of file, and generation of project. Generation
+        goes up once any file of project is saved or its unsaved text
+        is analyzed, as that may change usages anywhere in project,
+        and entries of earlier generations are dropped."""
+
+    MAX_ENTRIES = 32
+
+    def __init__(self):
+        """ Create empty UsagesCache."""
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # UsagesKey -> hits
+        self.generations = {}  # daemon key -> generation of project
+
+    def key(self, command, daemonKey, identifier):
+        """ Build key of command asked for identifier in project."""
+        with self.lock:
+            generation = self.generations.get(daemonKey, 0)
+        return UsagesKey(command, daemonKey, generation, *identifier)
+
+    def get(self, key):
+        """ Retrieve hits remembered under key, None if there are none."""
+        with self.lock:
+            hits = self.entries.get(key)
+            if hits is not None:
+                self.entries.move_to_end(key)
+            return hits
+
+    def put(self, key, hits):
+        """ Remember hits under key, unless project changed since."""
+        with self.lock:
+            if key.generation != self.generations.get(key.daemonKey, 0):
+                return
+            self.entries[key] = hits
+            self.entries.move_to_end(key)
+            while len(self.entries) > UsagesCache.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, daemonKey):
+        """ Drop entries of project, which changed."""
+        with self.lock:
+            self.generations[daemonKey] = (
+                self.generations.get(daemonKey, 0) + 1)
+            for key in [key for key in self.entries
+                        if key.daemonKey == daemonKey]:
+                del self.entries[key]
+
+
+class SymbolIndex:
+
+    """ Everything one global find command lists in one project."""
+
+    """ Hits are kept per file, so that hits of one file can be replaced
+        once it changes, and saved between sessions as JSON. Hits sorted
+        by name are built when asked for and kept until hits change."""
+
+    VERSION = 1
+
+    def __init__(self, command, path=None):
+        """ Create empty SymbolIndex saved to path."""
+        self.command = command
+        self.path = path
+        self.lock = threading.Lock()
+        self.files = {}  # filename -> hits
+        self.isComplete = False  # whole project was listed
+        self.isStale = False  # project changed in ways not reflected
+        self.sorted = None  # hits sorted by name
+        self.isSaveScheduled = False
+
+    def load(self):
+        """ Load index saved in previous session, tell whether it was there."""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("version") != SymbolIndex.VERSION or
+                    data.get("command") != self.command):
+                return False
+            files = dict(
+                (filename, [(row[0], filename, row[1], row[2], row[3])
+                            for row in rows])
+                for filename, rows in data["files"].items())
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            print("Cfserver: can't load %s: %s" % (self.path, e))
+            return False
+        with self.lock:
+            self.files = files
+            self.isComplete = True
+            self.isStale = True  # files may have changed since
+            self.sorted = None
+        return True
+
+    def save(self):
+        """ Save index for next session."""
+        with self.lock:
+            self.isSaveScheduled = False
+            if self.path is None or not self.isComplete:
+                return
+            data = {
+                "version": SymbolIndex.VERSION,
+                "command": self.command,
+                "files": dict(
+                    (filename, [(h[0], h[2], h[3], h[4]) for h in hits])
+                    for filename, hits in self.files.items()),
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print("Cfserver: can't save %s: %s" % (self.path, e))
+
+    def scheduleSave(self):
+        """ Save index a while later, once burst of changes is over."""
+        with self.lock:
+            if self.isSaveScheduled:
+                return
+            self.isSaveScheduled = True
+        sublime.set_timeout_async(self.save, SymbolIndex.SAVE_DELAY)
+
+    # Number of milliseconds changes are collected before index is saved.
+    SAVE_DELAY = 5000
+
+    @staticmethod
+    def groupByFile(hits):
+        """ Group hits by file, sharing one filename string per file."""
+        files = {}
+        for (matchtype, filename, fromOfs, toOfs, quote) in hits:
+            fileHits = files.get(filename)
+            if fileHits is None:
+                fileHits = files[filename] = []
+            else:
+                filename = fileHits[0][1]
+            fileHits.append((matchtype, filename, fromOfs, toOfs, quote))
+        return files
+
+    def replaceAll(self, hits):
+        """ Replace everything with hits listing whole project."""
+        files = SymbolIndex.groupByFile(hits)
+        with self.lock:
+            self.files = files
+            self.isComplete = True
+            self.isStale = False
+            self.sorted = None
+        self.scheduleSave()
+
+    def replaceFile(self, filename, hits):
+        """ Replace hits in filename."""
+        hits = SymbolIndex.groupByFile(
+            [hit for hit in hits if hit[1] == filename]).get(filename)
+        with self.lock:
+            if hits:
+                self.files[filename] = hits
+            else:
+                self.files.pop(filename, None)
+            self.sorted = None
+        self.scheduleSave()
+
+    def markStale(self):
+        """ Note that project changed in ways index does not reflect."""
+        with self.lock:
+            if self.isComplete:
+                self.isStale = True
+
+    def takeStale(self):
+        """ Tell whether index is stale, expecting caller to refresh it."""
+        with self.lock:
+            (isStale, self.isStale) = (self.isStale, False)
+        return isStale
+
+    def hits(self):
+        """ Retrieve all hits sorted by name."""
+        with self.lock:
+            if self.sorted is None:
+                hits = [hit for fileHits in self.files.values()
+                        for hit in fileHits]
+                hits.sort(key=lambda hit: hit[4].lower())
+                self.sorted = hits
+            return self.sorted
+
+
+class SymbolIndexes:
+
+    """ Symbol indexes of projects, loaded once needed."""
+
+    """ Global find commands list everything in project, so their
+        replies are indexed. Once file is saved, its names are asked for
+        with find-names-in-file and replaced, other indexes just get
+        refreshed next time they are used."""
+
+    COMMANDS = ("find-names", "find-macros", "find-files", "find-strings")
+
+    def __init__(self):
+        """ Create new SymbolIndexes."""
+        self.lock = threading.Lock()
+        self.indexes = {}  # (daemon key, command) -> SymbolIndex
+
+    @staticmethod
+    def path(daemonKey, command):
+        """ Build name of file index is saved in, None if there is none."""
+        directory = sublime.cache_path()
+        if not directory:
+            return None
+        return os.path.join(directory, "Cfserver", "%s-%08x.json" % (
+            command, zlib.crc32(repr(daemonKey[0]).encode("utf-8"))))
+
+    def get(self, daemonKey, command):
+        """ Retrieve index of project, load it if it was saved."""
+        with self.lock:
+            index = self.indexes.get((daemonKey, command))
+            if index is not None:
+                return index
+            index = self.indexes[(daemonKey, command)] = SymbolIndex(
+                command, SymbolIndexes.path(daemonKey, command))
+        index.load()
+        return index
+
+    def fileChanged(self, view):
+        """ Bring indexes up to date with file of view."""
+        daemonKey = Cfserver.daemonKey(view)
+        with self.lock:
+            indexes = [(command, self.indexes.get((daemonKey, command)))
+                       for command in SymbolIndexes.COMMANDS]
+        for (command, index) in indexes:
+            if index is None:
+                continue
+            if command != "find-names":
+                index.markStale()
+            elif index.isComplete:
+                SymbolIndexes.refreshFile(view, index)
+
+    @staticmethod
+    def refreshFile(view, index):
+        """ Ask Cfserver for names in file of view, replace them in index."""
+        filename = view.file_name()
+        handler = UsagesNamesHandler()
+        Cfserver.getDaemon(view).request(
+            "find-names-in-file \"%s\" \"\"" % (
+                filename.replace("\\", "\\\\")),
+            handler.type,
+            lambda lines: index.replaceFile(
+                filename, handler.hits(lines) or []),
+            key=("find-names-in-file", filename),
+            timeout=Cfserver.requestTimeout())
+
+
+class IncludeGraph:
+
+    """ Graph of files including one another within one project."""
+
+    """ Includes are found by scanning sources for #include lines, which
+        is cheap next to asking Cfserver, and rescanned only once file
+        is saved, or its modification time or size change. Those are
+        checked at most every RECHECK seconds. Include is resolved
+        relative to including file, then to project folders, then to
+        any file seen so far whose path ends with it; system headers
+        not found that way are left out."""
+
+    reInclude = re.compile(
+        br'^[ \t]*#[ \t]*include[ \t]*[<"]([^>"\r\n]+)[>"]', re.M)
+
+    # Number of seconds files are trusted not to be changed outside of
+    # editor before their modification time is checked again.
+    RECHECK = 10
+
+    def __init__(self, roots):
+        """ Create empty IncludeGraph of project with folders roots."""
+        self.roots = roots
+        self.lock = threading.Lock()
+        # filename -> (mtime, size, included filenames, time checked)
+        self.files = {}
+        self.known = {}  # basename -> filenames seen
+
+    def fileChanged(self, filename):
+        """ Note that filename was saved, so that it is scanned again."""
+        with self.lock:
+            self.files.pop(filename, None)
+
+    def includes(self, filename):
+        """ Retrieve files filename includes, scan it if it changed."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.files.get(filename)
+        if entry is not None and now < entry[3] + IncludeGraph.RECHECK:
+            return entry[2]
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return []
+        if (entry is not None and
+                entry[:2] == (stat.st_mtime, stat.st_size)):
+            with self.lock:
+                self.files[filename] = entry[:3] + (now,)
+            return entry[2]
+        try:
+            with open(filename, "rb") as f:
+                text = f.read()
+        except OSError:
+            return []
+        self.see(filename)
+        included = []
+        for spec in IncludeGraph.reInclude.findall(text):
+            resolved = self.resolve(
+                filename, spec.decode("utf-8", "replace").strip())
+            if resolved is not None and resolved not in included:
+                included.append(resolved)
+        with self.lock:
+            self.files[filename] = (
+                stat.st_mtime, stat.st_size, included, now)
+        return included
+
+    def see(self, filename):
+        """ Remember filename as candidate for resolving includes."""
+        with self.lock:
+            self.known.setdefault(
+                os.path.basename(filename), set()).add(filename)
+
+    def resolve(self, includer, spec):
+        """ Find file spec included from includer refers to."""
+        spec = os.path.normpath(spec)
+        for directory in [os.path.dirname(includer)] + self.roots:
+            candidate = os.path.normpath(os.path.join(directory, spec))
+            if os.path.isfile(candidate):
+                self.see(candidate)
+                return candidate
+        suffix = os.sep + spec
+        with self.lock:
+            for candidate in sorted(
+                    self.known.get(os.path.basename(spec), ())):
+                if candidate.endswith(suffix):
+                    return candidate
+        return None
+
+    def includers(self, header, modules):
+        """ Select modules including header, closest includers first."""
+
+        """ Returns (distance, module) pairs, where distance is number
+            of include steps from module to header."""
+        self.see(header)
+        found = []
+        for module in modules:
+            seen = set([module])
+            level = [module]
+            distance = 0
+            while level and header not in level:
+                distance += 1
+                nextLevel = []
+                for filename in level:
+                    for included in self.includes(filename):
+                        if included not in seen:
+                            seen.add(included)
+                            nextLevel.append(included)
+                level = nextLevel
+            if level and distance > 0:
+                found.append((distance, module))
+        found.sort()
+        return found
+
+
+class BackgroundAnalyzer:
+
+    """ Analyzer of every C/C++ source of project in the background."""
+
+    """ Sources found under project folders are registered with Cfserver
+        in one batch, then analyzed one at a time, so that Cfserver is
+        never busy with more than one of them. Next one is sent only
+        while no analysis or navigation request of the project is
+        waiting and user did not type or move caret for IDLE seconds.
+        Errors go to diagnostics cache, keyed by content of file on
+        disk, so that opening file shows them right away."""
+
+    SOURCE_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx", ".c++")
+
+    # Number of seconds editor has to be idle before next file is sent.
+    IDLE = 1.0
+
+    # Number of milliseconds to wait before checking again when busy.
+    POLL = 500
+
+    def __init__(self):
+        """ Create new BackgroundAnalyzer."""
+        self.lock = threading.Lock()
+        self.started = set()  # daemon keys of projects being analyzed
+        self.lastActivity = 0
+
+    def touch(self):
+        """ Note that user is working in editor."""
+        self.lastActivity = time.monotonic()
+
+    def isEnabled(self, view):
+        """ Check whether background analysis is turned on for view."""
+        return Cfserver.get_setting("background_analysis", False, view)
+
+    def start(self, view):
+        """ Start analysis of project of view, unless it was started."""
+        daemonKey = Cfserver.daemonKey(view)
+        with self.lock:
+            if daemonKey in self.started:
+                return
+            self.started.add(daemonKey)
+        roots = Cfserver.includeGraph(view).roots
+        sublime.set_timeout_async(
+            lambda: self.walk(view, daemonKey, roots), 0)
+
+    def stopAll(self):
+        """ Stop analysis of every project."""
+        with self.lock:
+            self.started.clear()
+
+    @staticmethod
+    def sources(roots):
+        """ List C/C++ sources under roots, skipping hidden ones."""
+        found = []
+        for root in roots:
+            for (directory, dirnames, filenames) in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames
+                                     if not d.startswith("."))
+                found.extend(
+                    os.path.join(directory, filename)
+                    for filename in sorted(filenames)
+                    if not filename.startswith(".") and
+                    filename.lower().endswith(
+                        BackgroundAnalyzer.SOURCE_EXTENSIONS))
+        return found
+
+    def walk(self, view, daemonKey, roots):
+        """ Find sources of project, register them and start analyzing."""
+        with Cfserver.stats.timed("background walk", daemonKey[0]):
+            sources = BackgroundAnalyzer.sources(roots)
+        Cfserver.getDaemon(view).registerModules(sources)
+        self.step(view, daemonKey, sources, 0)
+
+    def isBusy(self, view, daemonKey):
+        """ Check whether interactive work is going on in project."""
+        if time.monotonic() < self.lastActivity + BackgroundAnalyzer.IDLE:
+            return True
+        if Cfserver.scheduler.hasWork(daemonKey):
+            return True
+        router = Cfserver.getDaemon(view).router
+        return (router.isPending(CfserverFind.REQUEST_KEY) or
+                router.isPending(GotoPrefetcher.REQUEST_KEY))
+
+    def step(self, view, daemonKey, sources, done):
+        """ Analyze next source once interactive work is over."""
+
+        """ Sources that need no analysis are skipped in a loop, and step
+            after reply is scheduled rather than called, so that calls
+            do not nest however many sources there are."""
+        while True:
+            with self.lock:
+                if daemonKey not in self.started:
+                    return
+            if not self.isEnabled(view) or done >= len(sources):
+                Cfserver.reportProgressEnd([])
+                return
+            if self.isBusy(view, daemonKey):
+                sublime.set_timeout_async(
+                    lambda: self.step(view, daemonKey, sources, done),
+                    BackgroundAnalyzer.POLL)
+                return
+            filename = sources[done]
+            done += 1
+            # open files are analyzed as usual, cached ones are known
+            if (Cfserver.findOpenFile(filename) is None and
+                    Cfserver.fileErrors(filename) is None):
+                break
+        Cfserver.reportProgress("analyzing project %d/%d" % (
+            done, len(sources)))
+        request = Cfserver.analyzeFile(
+            Cfserver.getDaemon(view), filename, filename,
+            lambda lines: Cfserver.storeFileErrors(filename, lines),
+            timeout=Cfserver.requestTimeout())
+        request.addDoneCallback(lambda request: sublime.set_timeout_async(
+            lambda: self.step(view, daemonKey, sources, done), 0))
+
+
+class BatchAnalysis:
+
+    """ Analysis of whole project split across several Cfservers."""
+
+    """ Sources are sorted by path and split into contiguous shards, so
+        that files of one directory, which likely include the same
+        headers, go to the same Cfserver. Every shard has Cfserver of
+        its own and sends one file at a time; shard that runs out of
+        files takes the last ones of the shard with most left. Errors
+        go to output as they come: PanelOutput in editor, JsonLinesOutput
+        or SarifOutput on command line."""
+
+    # Number of seconds between progress updates.
+    PROGRESS_INTERVAL = 0.25
+
+    # Number of milliseconds to wait before file Cfserver did not get
+    # is sent again.
+    RETRY_DELAY = 500
+
+    # Number of times in a row Cfserver of shard may exit soon after
+    # start before the rest of its files are given up on.
+    MAX_CRASHES = 4
+
+    def __init__(self, paths, shardCount, key, output, timeout):
+        """ Create analysis of paths by shardCount Cfservers of key."""
+
+        """ Paths are files, or directories to analyze sources in."""
+        self.paths = paths
+        self.shardCount = shardCount
+        self.key = key  # (root, cmd, in_log, out_log)
+        self.output = output
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.outputLock = threading.Lock()
+        self.isCancelled = False
+        self.failure = None  # why analysis could not go on, if it could not
+        self.finished = threading.Event()
+        self.total = 0
+        self.counts = collections.Counter()
+        self.reportedAt = 0
+        self.queues = []
+        self.done = []
+        self.daemons = []
+        self.startedAt = time.monotonic()
+
+    def start(self):
+        """ Find sources, start every shard."""
+
+        """ Walking directories may take a while, so this is to be
+            called off UI thread. Paths that can't be read are reported
+            as not checked."""
+        sources = []
+        unreadable = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                sources.extend(BackgroundAnalyzer.sources([path]))
+            elif os.path.isfile(path) and os.access(path, os.R_OK):
+                sources.append(path)
+            else:
+                unreadable.append(path)
+        shardCount = max(1, min(self.shardCount, len(sources)))
+        size = -(-len(sources) // shardCount) if sources else 0
+        with self.lock:
+            if self.isCancelled:
+                return
+            self.total = len(sources)
+            self.queues = [collections.deque(sources[ndx:ndx + size])
+                           for ndx in range(0, len(sources), size or 1)]
+            self.done = [0] * len(self.queues)
+            self.counts["failed"] += len(unreadable)
+        with self.outputLock:
+            self.output.start(self.total, len(self.queues))
+            for path in unreadable:
+                self.output.unanswered(path, "can't read file")
+        for shard, files in enumerate(self.queues):
+            try:
+                daemon = Daemon(*self.shardKey(shard)[1:])
+            except OSError as e:
+                self.fail("can't start %s: %s" % (self.key[1], e))
+                return
+            with self.lock:
+                if self.isCancelled:
+                    daemon.stop()
+                    return
+                self.daemons.append(daemon)
+            daemon.registerModules(list(files))
+            self.step(shard)
+        if not self.queues:
+            self.finish()
+
+    def shardKey(self, shard):
+        """ Compute daemon key of shard, with logs of its own."""
+        (root, cmd, inLog, outLog) = self.key
+        return (root, cmd,
+                "%s-%d" % (inLog, shard) if inLog else inLog,
+                "%s-%d" % (outLog, shard) if outLog else outLog)
+
+    def cancel(self):
+        """ Stop every shard."""
+        with self.lock:
+            if self.isCancelled:
+                return
+            self.isCancelled = True
+            daemons = list(self.daemons)
+        for daemon in daemons:
+            daemon.stop()
+        with self.outputLock:
+            self.output.cancel(sum(self.done), self.total)
+        self.finished.set()
+
+    def fail(self, message):
+        """ Stop every shard, as analysis can't go on."""
+        print("Cfserver: %s" % (message))
+        with self.lock:
+            if self.failure is None:
+                self.failure = message
+        self.cancel()
+
+    def next(self, shard):
+        """ Take next file for shard, None once every file is taken."""
+        with self.lock:
+            if self.isCancelled:
+                return None
+            queue = self.queues[shard]
+            if queue:
+                return queue.popleft()
+            longest = max(self.queues, key=len)
+            return longest.pop() if longest else None
+
+    def putBack(self, shard, filename):
+        """ Return file to the front of shard, to be sent again."""
+        with self.lock:
+            self.queues[shard].appendleft(filename)
+
+    def step(self, shard):
+        """ Send next file of shard."""
+
+        """ Loops only over files that are not sent, and step after
+            request is finished is scheduled, so that calls never nest.
+            While Cfserver of shard waits to be restarted, file is put
+            back and sent once it is; files of shard whose Cfserver
+            keeps exiting are reported as not answered."""
+        while True:
+            filename = self.next(shard)
+            if filename is None:
+                self.finishShard(shard)
+                return
+            daemon = self.daemons[shard]
+            daemon.restartIfInactive(*self.shardKey(shard)[1:])
+            if daemon.crashes >= BatchAnalysis.MAX_CRASHES:
+                self.finishFile(shard, filename, None, "cfserver keeps exiting")
+                continue
+            if not daemon.isRunning():
+                self.putBack(shard, filename)
+                set_timeout_async(lambda: self.step(shard),
+                                  BatchAnalysis.RETRY_DELAY)
+                return
+            # Reply is taken from request once it is finished.
+            request = Cfserver.analyzeFile(
+                daemon, filename, filename, lambda lines: None,
+                timeout=self.timeout)
+            request.addDoneCallback(lambda request: set_timeout_async(
+                lambda: self.stepped(shard, filename, request), 0))
+            return
+
+    def stepped(self, shard, filename, request):
+        """ Report what shard got for file, go on with next one."""
+        with self.lock:
+            if self.isCancelled:
+                return
+        if request.state in (Request.FAILED, Request.CANCELLED):
+            # not sent, or Cfserver exited before answering
+            self.putBack(shard, filename)
+            set_timeout_async(lambda: self.step(shard),
+                              BatchAnalysis.RETRY_DELAY)
+            return
+        if request.state == Request.DONE:
+            self.finishFile(shard, filename, request.reply, None)
+        else:
+            self.finishFile(shard, filename, None,
+                            "cfserver did not answer in time")
+        self.step(shard)
+
+    def finishFile(self, shard, filename, lines, failure):
+        """ Report errors of file, or failure if there are none."""
+        result = None
+        if lines is not None:
+            result = Cfserver.readFileErrors(filename, lines)
+            if result is None:
+                failure = "can't read file, or cfserver reply is malformed"
+        with self.lock:
+            if self.isCancelled:
+                return
+            self.done[shard] += 1
+            if result is None:
+                self.counts["failed"] += 1
+            else:
+                self.counts.update(
+                    "errors" if record.type == "ERROR" else "warnings"
+                    for record in result[0].records)
+        with self.outputLock:
+            if result is None:
+                self.output.unanswered(filename, failure)
+            else:
+                self.output.errors(filename, *result)
+        self.reportProgress()
+
+    @staticmethod
+    def positions(text, records):
+        """ Compute 1-based (line, column, endLine, endColumn) of records."""
+
+        """ Offsets of line ends are found once per file, so that every
+            record costs two bisections of them."""
+        newlines = [match.start() for match in re.finditer("\n", text)]
+
+        def position(offset):
+            line = bisect.bisect_left(newlines, offset)
+            return (line + 1, offset - (newlines[line - 1] if line else -1))
+        return [position(record.fromOfs) + position(record.toOfs)
+                for record in records]
+
+    def reportProgress(self):
+        """ Let output show how far every shard got."""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.reportedAt + BatchAnalysis.PROGRESS_INTERVAL:
+                return
+            self.reportedAt = now
+            done = list(self.done)
+        with self.outputLock:
+            self.output.progress(sum(done), self.total, done)
+
+    def finishShard(self, shard):
+        """ Stop Cfserver of shard, finish once every shard is done."""
+        with self.lock:
+            if self.isCancelled:
+                return
+            daemon = self.daemons[shard]
+            isFinished = sum(self.done) == self.total
+        if isFinished:
+            self.finish()
+        else:
+            daemon.stop()
+
+    def finish(self):
+        """ Report totals, stop Cfservers."""
+        with self.lock:
+            if self.isCancelled:
+                return
+            self.isCancelled = True  # nothing is to be sent any more
+            daemons = list(self.daemons)
+        for daemon in daemons:
+            daemon.stop()
+        with self.outputLock:
+            self.output.finish(self.total, time.monotonic() - self.startedAt,
+                               self.counts)
+        self.finished.set()
+
+
+class PanelOutput:
+
+    """ Output of batch analysis to output panel of window."""
+
+    """ Errors go to diagnostics cache as well, and are shown right
+        away in unchanged views of files they are in."""
+
+    PANEL = "cfserver_check"
+
+    def __init__(self, window):
+        """ Create new PanelOutput."""
+        self.window = window
+        self.panel = window.create_output_panel(PanelOutput.PANEL)
+        self.panel.settings().set(
+            "result_file_regex", r"^(.+):(\d+):(\d+): (.*)$")
+
+    def start(self, total, shards):
+        """ Show panel."""
+        self.append("Checking %d files with %d cfserver(s)\n" % (
+            total, shards))
+        self.window.run_command(
+            "show_panel", {"panel": "output.%s" % (PanelOutput.PANEL)})
+
+    def errors(self, filename, errors, text, contentKey):
+        """ Write errors of file to panel."""
+        Cfserver.diagnostics.put(filename, contentKey, errors)
+        output = []
+        records = sorted(errors.records, key=lambda r: r.fromOfs)
+        for (record, (line, column, _, _)) in zip(
+                records, BatchAnalysis.positions(text, records)):
+            output.append("%s:%d:%d: %s: %s\n" % (
+                filename, line, column, record.type.lower(), record.message))
+        if output:
+            self.append("".join(output))
+        view = Cfserver.findOpenFile(filename)
+        if view is not None and not view.is_dirty():
+            Cfserver.redrawFromCache(view)
+
+    def unanswered(self, filename, failure):
+        """ Note that file was not checked, and why."""
+        self.append("%s:1:1: %s\n" % (filename, failure))
+
+    def progress(self, done, total, perShard):
+        """ Show how far every shard got in status bar."""
+        Cfserver.reportProgress("checked %d/%d files, per cfserver %s" % (
+            done, total, " ".join("%d" % (n) for n in perShard)))
+
+    def finish(self, total, seconds, counts):
+        """ Write totals to panel."""
+        self.append("Checked %d files in %.1f s: %d error(s), %d warning(s), "
+                    "%d file(s) not checked\n" % (
+                        total, seconds, counts["errors"], counts["warnings"],
+                        counts["failed"]))
+        Cfserver.reportProgressEnd([])
+
+    def cancel(self, done, total):
+        """ Note that analysis was cancelled."""
+        self.append("Cancelled after %d of %d files\n" % (done, total))
+        Cfserver.reportProgressEnd([])
+
+    def append(self, text):
+        """ Append text to output panel."""
+        self.panel.run_command(
+            "append", {"characters": text, "force": True,
+                       "scroll_to_end": True})
+
+
+class JsonLinesOutput:
+
+    """ Output of batch analysis as JSON object per diagnostic."""
+
+    def __init__(self, stream, progressStream=None):
+        """ Create output writing to stream, progress to progressStream."""
+        self.stream = stream
+        self.progressStream = progressStream
+
+    def start(self, total, shards):
+        """ Start output."""
+        self.showProgress("checking %d files with %d cfserver(s)" % (
+            total, shards))
+
+    @staticmethod
+    def diagnostics(filename, errors, text):
+        """ Convert errors of file to dictionaries."""
+        found = []
+        records = sorted(errors.records, key=lambda r: r.fromOfs)
+        for (record, (line, column, endLine, endColumn)) in zip(
+                records, BatchAnalysis.positions(text, records)):
+            found.append({
+                "file": filename,
+                "line": line, "column": column,
+                "endLine": endLine, "endColumn": endColumn,
+                "severity": "error" if record.type == "ERROR" else "warning",
+                "message": record.message,
+            })
+        return found
+
+    def errors(self, filename, errors, text, contentKey):
+        """ Write errors of file, one line each."""
+        self.stream.write("".join(
+            "%s\n" % (json.dumps(diagnostic))
+            for diagnostic in JsonLinesOutput.diagnostics(
+                filename, errors, text)))
+        self.stream.flush()
+
+    def unanswered(self, filename, failure):
+        """ Note that file was not checked, and why."""
+        self.stream.write("%s\n" % (json.dumps({
+            "file": filename, "severity": "error", "message": failure})))
+        self.stream.flush()
+
+    def progress(self, done, total, perShard):
+        """ Show how far every shard got."""
+        self.showProgress("checked %d/%d files, per cfserver %s" % (
+            done, total, " ".join("%d" % (n) for n in perShard)))
+
+    def finish(self, total, seconds, counts):
+        """ Show totals."""
+        self.showProgress(
+            "checked %d files in %.1f s: %d error(s), %d warning(s), "
+            "%d file(s) not checked" % (
+                total, seconds, counts["errors"], counts["warnings"],
+                counts["failed"]))
+
+    def cancel(self, done, total):
+        """ Note that analysis was cancelled."""
+        self.showProgress("cancelled after %d of %d files" % (done, total))
+
+    def showProgress(self, message):
+        """ Write progress message, if there is where to."""
+        if self.progressStream is not None:
+            self.progressStream.write("cfserver: %s\n" % (message))
+            self.progressStream.flush()
+
+
+class SarifOutput(JsonLinesOutput):
+
+    """ Output of batch analysis as SARIF 2.1.0 log."""
+
+    """ Log is written as results come: head of the log first, then
+        results separated by commas, and the tail once analysis is
+        over, so that it is valid JSON only once finished."""
+
+    HEAD = ('{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+            '"version": "2.1.0", "runs": [{"tool": {"driver": '
+            '{"name": "cfserver", "informationUri": '
+            '"https://github.com/aam/cfserver-sublime-bundle"}}, '
+            '"columnKind": "unicodeCodePoints", "results": [\n')
+
+    TAIL = ']}]}\n'
+
+    def __init__(self, stream, progressStream=None):
+        """ Create output writing to stream, progress to progressStream."""
+        super().__init__(stream, progressStream)
+        self.count = 0
+
+    @staticmethod
+    def uri(filename):
+        """ Convert filename to file URI."""
+        path = os.path.abspath(filename).replace(os.sep, "/")
+        if not path.startswith("/"):
+            path = "/" + path  # drive letter
+        return "file://" + urllib.parse.quote(path)
+
+    def start(self, total, shards):
+        """ Write head of the log."""
+        super().start(total, shards)
+        self.stream.write(SarifOutput.HEAD)
+
+    def errors(self, filename, errors, text, contentKey):
+        """ Write errors of file as results."""
+        uri = SarifOutput.uri(filename)
+        for diagnostic in JsonLinesOutput.diagnostics(filename, errors, text):
+            self.write({
+                "ruleId": "cfserver",
+                "level": diagnostic["severity"],
+                "message": {"text": diagnostic["message"]},
+                "locations": [{"physicalLocation": {
+                    "artifactLocation": {"uri": uri},
+                    "region": {
+                        "startLine": diagnostic["line"],
+                        "startColumn": diagnostic["column"],
+                        "endLine": diagnostic["endLine"],
+                        "endColumn": diagnostic["endColumn"]}}}],
+            })
+        self.stream.flush()
+
+    def unanswered(self, filename, failure):
+        """ Note that file was not checked, and why."""
+        self.write({
+            "ruleId": "cfserver", "level": "error",
+            "message": {"text": failure},
+            "locations": [{"physicalLocation": {
+                "artifactLocation": {"uri": SarifOutput.uri(filename)}}}],
+        })
+        self.stream.flush()
+
+    def write(self, result):
+        """ Write one result."""
+        self.stream.write("%s%s" % (",\n" if self.count else "",
+                                    json.dumps(result)))
+        self.count += 1
+
+    def finish(self, total, seconds, counts):
+        """ Write tail of the log."""
+        self.stream.write(SarifOutput.TAIL)
+        self.stream.flush()
+        super().finish(total, seconds, counts)
+
+    def cancel(self, done, total):
+        """ Write tail of the log, so that it is valid JSON."""
+        self.stream.write(SarifOutput.TAIL)
+        self.stream.flush()
+        super().cancel(done, total)
+
+
+class GotoPrefetcher:
+
+    """ Speculative goto-def of identifier caret rests on."""
+
+    """ Once caret stays on identifier for goto_prefetch_delay, goto-def
+        is sent in the background and its reply is kept for that version
+        of file and that identifier. Prefetch waits while navigation
+        requested by user is in progress or commands are queued, and it
+        is cancelled once caret moves elsewhere."""
+
+    MAX_CACHED = 64
+
+    REQUEST_KEY = "prefetch"
+
+    reIdentifier = re.compile(r"[^\W\d]\w*$")
+
+    def __init__(self):
+        """ Create new GotoPrefetcher."""
+        self.lock = threading.Lock()
+        self.cache = collections.OrderedDict()  # identifier key -> reply
+        self.inFlight = None  # (identifier key, request, router)
+        self.generation = 0
+
+    @staticmethod
+    def identifierKey(view):
+        """ Identify identifier at caret in current version of view."""
+
+        """ Returns None unless there is single caret on identifier."""
+        selection = view.sel()
+        if len(selection) != 1 or not selection[0].empty():
+            return None
+        word = view.word(selection[0].begin())
+        if not GotoPrefetcher.reIdentifier.match(view.substr(word)):
+            return None
+        return (view.file_name(), view.change_count(), word.begin(), word.end())
+
+    def caretMoved(self, view):
+        """ Cancel prefetch of other identifier, prefetch this one once idle."""
+        delay = Cfserver.get_setting("goto_prefetch_delay", 0, view)
+        key = GotoPrefetcher.identifierKey(view)
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        if self.inFlightKey() != key:
+            self.cancel()
+        if delay and key is not None:
+            sublime.set_timeout_async(
+                lambda: self.prefetch(view, generation), delay)
+
+    def inFlightKey(self):
+        """ Retrieve identifier key of prefetch in flight, if any."""
+        with self.lock:
+            return self.inFlight[0] if self.inFlight is not None else None
+
+    def cancel(self):
+        """ Cancel prefetch in flight, if any."""
+        with self.lock:
+            inFlight = self.inFlight
+            self.inFlight = None
+        if inFlight is not None:
+            inFlight[2].cancel(inFlight[1])
+
+    def prefetch(self, view, generation):
+        """ Send goto-def unless caret moved or reply is known."""
+        with self.lock:
+            if generation != self.generation:
+                return
+        key = GotoPrefetcher.identifierKey(view)
+        with self.lock:
+            if (key is None or key in self.cache or
+                    (self.inFlight is not None and self.inFlight[0] == key)):
+                return
+        daemon = Cfserver.getDaemon(view)
+        if (daemon.router.isPending(CfserverFind.REQUEST_KEY) or
+                daemon.queueDepth() > 0):
+            # yield to user, try again after another delay
+            delay = Cfserver.get_setting("goto_prefetch_delay", 0, view)
+            if delay:
+                sublime.set_timeout_async(
+                    lambda: self.prefetch(view, generation), delay)
+            return
+        request = daemon.request(
+            CfserverContextFind.findCommand("goto-def", view),
+            "USAGES", lambda lines: self.store(view, key, lines),
+            key=GotoPrefetcher.REQUEST_KEY, timeout=Cfserver.requestTimeout())
+        with self.lock:
+            self.inFlight = (key, request, daemon.router)
+        request.addDoneCallback(self.finished)
+
+    def finished(self, request):
+        """ Forget prefetch that is no longer in flight."""
+        with self.lock:
+            if self.inFlight is not None and self.inFlight[1] is request:
+                self.inFlight = None
+
+    def store(self, view, key, lines):
+        """ Remember reply to prefetch, preload files it points to."""
+        with self.lock:
+            self.cache[key] = lines
+            while len(self.cache) > GotoPrefetcher.MAX_CACHED:
+                self.cache.popitem(last=False)
+        if Cfserver.get_setting("goto_prefetch_preload", False, view):
+            parser = UsagesHandler().parser()
+            if parser.parse(lines):
+                filenames = set(
+                    Cfserver.originalFilename(record.filename)
+                    for record in parser.records)
+                threading.Thread(target=GotoPrefetcher.preload,
+                                 args=(sorted(filenames),)).start()
+
+    @staticmethod
+    def preload(filenames):
+        """ Read files that are not open yet, so that opening them is fast."""
+        for filename in filenames:
+            if Cfserver.findOpenFile(filename) is None:
+                try:
+                    with open(filename, "rb") as f:
+                        while f.read(1024 * 1024):
+                            pass
+                except OSError:
+                    pass
+
+    def take(self, view):
+        """ Retrieve (reply, request in flight) for identifier at caret."""
+        key = GotoPrefetcher.identifierKey(view)
+        with self.lock:
+            if key is None:
+                return (None, None)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return (self.cache[key], None)
+            if self.inFlight is not None and self.inFlight[0] == key:
+                return (None, self.inFlight[1])
+        return (None, None)
+
+
+class Cfserver():
+
+    """ Basic Sublime plugin functionality."""
+
+    def get_settings():
+        """ Retrieve settings."""
+        return sublime.load_settings("Cfserver.sublime-settings")
+
+    def get_setting(key, default=None, view=None):
+        """ Retrieve one settings."""
+        try:
+            if view is None:
+                view = sublime.active_window().active_view()
+            s = view.settings()
+            if s.has("cfserver_%s" % key):
+                return s.get("cfserver_%s" % key)
+        except:
+            pass
+        return Cfserver.get_settings().get(key, default)
+
+    daemons = DaemonPool()
+
+    @staticmethod
+    def getDaemon(view=None):
+        """ Retrieve existing daemon for project of view or creates new one."""
+        if view is None:
+            view = sublime.active_window().active_view()
+        key = Cfserver.daemonKey(view)
+
+        Cfserver.daemons.evictIdle(
+            Cfserver.get_setting("daemon_idle_timeout", 1800, view),
+            Cfserver.get_setting("daemon_memory_limit", 0, view))
+        (daemon, created) = Cfserver.daemons.get(
+            key, lambda: Daemon(*key[1:], recorder=Cfserver.recorder(view)))
+
+        if created:
+            daemon.addHandler(ErrorsHandler())
+            daemon.addHandler(
+                Handler("ERRORS-CLEAR", lambda lines: Cfserver.clearErrors(
+                    daemon.router, lines)))
+            daemon.addHandler(
+                Handler("PROGRESS-START", Cfserver.reportProgressStart))
+            daemon.addHandler(
+                Handler("PROGRESS-END", Cfserver.reportProgressEnd))
+        elif daemon.restartIfInactive(*key[1:]):
+            Cfserver.reanalyzeVisibleViews(key)
+
+        return daemon
+
+    @staticmethod
+    def recorder(view):
+        """ Create recorder of protocol traffic if it is turned on."""
+        path = Cfserver.get_setting("protocol_recording", "", view)
+        if path is None or path == "":
+            return None
+        return ProtocolRecorder(
+            DaemonPool.logName(path, Cfserver.projectRoot(view)))
+
+    @staticmethod
+    def reanalyzeVisibleViews(key):
+        """ Schedule analysis of visible views served by daemon with key."""
+        for window in sublime.windows():
+            for group in range(window.num_groups()):
+                view = window.active_view_in_group(group)
+                if (view is not None and view.file_name() is not None and
+                        is_supported_language(view) and
+                        Cfserver.daemonKey(view) == key):
+                    Cfserver.scheduler.schedule(view, force=True)
+
+    @staticmethod
+    def daemonKey(view):
+        """ Compute (root, cmd, in_log, out_log) of daemon serving view."""
+        root = Cfserver.projectRoot(view)
+        return (root,
+                Cfserver.cfserverExecutable(view),
+                DaemonPool.logName(Cfserver.cfserverInLog(view), root),
+                DaemonPool.logName(Cfserver.cfserverOutLog(view), root))
+
+    @staticmethod
+    def projectRoot(view):
+        """ Find root of project file in view belongs to."""
+        filename = view.file_name() if view is not None else None
+        window = view.window() if view is not None else None
+        if window is None:
+            window = sublime.active_window()
+        folders = window.folders() if window is not None else []
+        if filename is not None:
+            for folder in folders:
+                if filename.startswith(os.path.join(folder, "")):
+                    return folder
+        if folders:
+            return folders[0]
+        return os.path.dirname(filename) if filename is not None else ""
+
+    @staticmethod
+    def cfserverExecutable(view=None):
+        """ Retrieve cfserver executable name from settings."""
+        return Cfserver.get_setting("cfserver_path", "cfserver.exe", view)
+
+    @staticmethod
+    def cfserverInLog(view=None):
+        """ Retrieve location for cfserver in log from settings."""
+        return Cfserver.get_setting("cfserver_inlog", "in", view)
+
+    @staticmethod
+    def cfserverOutLog(view=None):
+        """ Retrieve location for cfserver out log from settings."""
+        return Cfserver.get_setting("cfserver_outlog", "out", view)
+
+    @staticmethod
+    def analysisDelay():
+        """ Retrieve number of milliseconds to wait before analysis."""
+        return Cfserver.get_setting("analysis_delay", 300)
+
+    @staticmethod
+    def requestTimeout():
+        """ Retrieve number of seconds to wait for Cfserver reply."""
+        return Cfserver.get_setting("request_timeout", 30)
+
+    @staticmethod
+    def registerFileIfNotLoaded(daemon, filename):
+        """ Ask Cfserver to load the  file if see it for the first time."""
+        if (not daemon.isFileRegistered(filename)):
+            daemon.registerFile(filename)
+            basename = os.path.basename(filename)
+            print("registerFileIfNotLoaded basename='%s'" % basename)
+            command = Daemon.moduleCommand(filename)
+            if command is not None:
+                daemon.sendCommand(command)
+            return True
+        else:
+            return False
+
+    @staticmethod
+    def analyzeModule(view):
+        """ Issue Cfserver command to analyze file in given view."""
+        if (view.is_dirty() and
+                Cfserver.get_setting("analyze_unsaved", False, view) and
+                Daemon.moduleCommand(view.file_name()) is not None):
+            request = Cfserver.analyzeBuffer(view)
+            if request is not None:
+                return request
+        contentKey = DiagnosticsCache.contentKey(view)
+        return Cfserver.analyzeFile(
+            Cfserver.getDaemon(view), view.file_name(), view.file_name(),
+            lambda lines: Cfserver.showFileErrors(view, contentKey, lines),
+            timeout=Cfserver.requestTimeout())
+
+    @staticmethod
+    def analyzeFile(daemon, filename, errorsFilename, callback=None,
+                    timeout=None):
+        """ Make Cfserver reload filename and analyze it."""
+        escapedFilename = filename.replace("\\", "\\\\")
+        if not Cfserver.registerFileIfNotLoaded(daemon, filename):
+            daemon.sendCommand("reload \"%s\"" % (escapedFilename))
+        idErrors = daemon.getNextUniqueId()
+        return daemon.request(
+            "analyze -n %d \"%s\" 0 end" % (idErrors, escapedFilename),
+            "ERRORS", callback, key=("analyze", errorsFilename),
+            timeout=timeout, id=idErrors, filename=filename)
+
+    # Offset translation of recent versions of views.
+    offsetIndexes = collections.OrderedDict()  # view id -> (version, index)
+    offsetIndexesLock = threading.Lock()
+    MAX_OFFSET_INDEXES = 16
+
+    @staticmethod
+    def offsetIndex(view):
+        """ Retrieve offset translation for current text of view."""
+        version = view.change_count()
+        with Cfserver.offsetIndexesLock:
+            entry = Cfserver.offsetIndexes.get(view.id())
+            if entry is not None and entry[0] == version:
+                Cfserver.offsetIndexes.move_to_end(view.id())
+                return entry[1]
+        index = OffsetIndex(view.substr(sublime.Region(0, view.size())))
+        with Cfserver.offsetIndexesLock:
+            Cfserver.offsetIndexes[view.id()] = (version, index)
+            Cfserver.offsetIndexes.move_to_end(view.id())
+            while len(Cfserver.offsetIndexes) > Cfserver.MAX_OFFSET_INDEXES:
+                Cfserver.offsetIndexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def charRecords(view, records):
+        """ Translate byte offsets of records to characters of view."""
+        index = Cfserver.offsetIndex(view)
+        if index.isIdentity:
+            return records
+        charOffset = index.charOffset
+        return [r._replace(fromOfs=charOffset(r.fromOfs),
+                           toOfs=charOffset(r.toOfs)) for r in records]
+
+    # Unsaved text of view is analyzed from hidden shadow file next to
+    # the file, where quoted includes relative to it are found.
+    SHADOW_PREFIX = ".cfserver-"
+
+    shadows = {}  # shadow file -> file it was written for
+    shadowOwners = {}  # shadow file -> owner of analysis in progress
+    shadowsLock = threading.Lock()
+
+    @staticmethod
+    def shadowFilename(filename):
+        """ Retrieve name of shadow file holding unsaved text of filename."""
+        (directory, basename) = os.path.split(filename)
+        return os.path.join(directory, Cfserver.SHADOW_PREFIX + basename)
+
+    @staticmethod
+    def originalFilename(filename):
+        """ Retrieve name of file given shadow file was written for."""
+        with Cfserver.shadowsLock:
+            return Cfserver.shadows.get(filename, filename)
+
+    @staticmethod
+    def analyzeBuffer(view):
+        """ Issue Cfserver command to analyze unsaved text of view."""
+
+        """ Errors are tagged with change count of view at the time text
+            was taken, and dropped if view changed by the time they
+            arrive. Returns None if shadow file can't be written."""
+        filename = view.file_name()
+        shadow = Cfserver.shadowFilename(filename)
+        text = view.substr(sublime.Region(0, view.size()))
+        changeCount = view.change_count()
+        contentKey = zlib.crc32(text.encode("utf-8"))
+        daemon = Cfserver.getDaemon(view)
+        owner = object()
+        with Cfserver.shadowsLock:
+            try:
+                with open(shadow, "wb") as f:
+                    f.write(text.encode("utf-8"))
+            except OSError as e:
+                print("Cfserver: can't write %s: %s" % (shadow, e))
+                return None
+            Cfserver.shadows[shadow] = filename
+            Cfserver.shadowOwners[shadow] = owner
+        request = Cfserver.analyzeFile(
+            daemon, shadow, filename,
+            lambda lines: Cfserver.showBufferErrors(
+                view, changeCount, contentKey, lines),
+            timeout=Cfserver.requestTimeout())
+        request.addDoneCallback(
+            lambda request: Cfserver.removeShadow(daemon, shadow, owner))
+        return request
+
+    @staticmethod
+    def showBufferErrors(view, changeCount, contentKey, lines):
+        """ Show errors found in unsaved text, unless view changed since."""
+        parser = ErrorsParser()
+        with Cfserver.stats.timed("ERRORS parse", lines[0]):
+            isComplete = parser.parse(lines)
+        if not isComplete or view.change_count() != changeCount:
+            return
+        Cfserver.usages.invalidate(Cfserver.daemonKey(view))
+        errors = ErrorsInFile(Cfserver.charRecords(view, parser.records))
+        with Cfserver.stats.timed("ERRORS render", lines[0]):
+            ErrorsHandler.render(view, errors)
+        Cfserver.diagnostics.put(view.file_name(), contentKey, errors)
+
+    @staticmethod
+    def showFileErrors(view, contentKey, lines):
+        """ Show errors found in file of view, cache them for contentKey."""
+
+        """ Content key is the one view had when analysis was asked
+            for, so that errors are not cached for text edited since."""
+        parser = ErrorsParser()
+        with Cfserver.stats.timed("ERRORS parse", lines[0]):
+            isComplete = parser.parse(lines)
+        if not isComplete:
+            return
+        errors = ErrorsInFile(Cfserver.charRecords(view, parser.records))
+        with Cfserver.stats.timed("ERRORS render", lines[0]):
+            ErrorsHandler.render(view, errors)
+        Cfserver.diagnostics.put(view.file_name(), contentKey, errors)
+
+    @staticmethod
+    def removeShadow(daemon, shadow, owner):
+        """ Remove shadow file once analysis of owner is finished."""
+
+        """ Shadow file is left alone if it was written again for later
+            analysis since. Cfserver has no command to drop a module,
+            so it is only forgotten by daemon, which then neither
+            replays it on restart nor takes it as loaded next time."""
+        with Cfserver.shadowsLock:
+            if Cfserver.shadowOwners.get(shadow) is not owner:
+                return
+            del Cfserver.shadowOwners[shadow]
+            daemon.unregisterFile(shadow)
+            try:
+                os.remove(shadow)
+            except OSError:
+                pass
+
+    @staticmethod
+    def removeShadows():
+        """ Remove shadow files of analyses still in progress."""
+        with Cfserver.shadowsLock:
+            shadows = list(Cfserver.shadowOwners)
+            Cfserver.shadowOwners.clear()
+        for shadow in shadows:
+            try:
+                os.remove(shadow)
+            except OSError:
+                pass
+
+    @staticmethod
+    def sweepShadows():
+        """ Remove shadow files of open files left behind by earlier session."""
+
+        """ Editor that did not unload plugin leaves shadow files of
+            analyses that were in progress."""
+        filenames = [view.file_name() for window in sublime.windows()
+                     for view in window.views()
+                     if view.file_name() is not None]
+        for filename in filenames:
+            shadow = Cfserver.shadowFilename(filename)
+            with Cfserver.shadowsLock:
+                if shadow in Cfserver.shadowOwners:
+                    continue
+                try:
+                    os.remove(shadow)
+                except OSError:
+                    pass
+
+    reProgressStart = re.compile(
+        r'PROGRESS-START \"(?P<message>.+)\"',
+        re.MULTILINE)
+
+    @staticmethod
+    def reportProgressStart(lines):
+        """ Handle PROGRESS-START Cfserver response."""
+        match = Cfserver.reProgressStart.match(lines[0])
+        if match:
+            Cfserver.reportProgress(match.group('message'))
+
+    @staticmethod
+    def reportProgress(message):
+        """ Show progress message in status bar."""
+        sublime.status_message("Cfserver: %s" % (message))
+
+    @staticmethod
+    def reportProgressEnd(lines):
+        """ Handle PROGRESS-END Cfserver response."""
+        sublime.status_message("")
+
+    # Errors of recently analyzed files.
+    diagnostics = DiagnosticsCache()
+
+    stats = Stats()
+
+    edits = EditTracker()
+
+    outputLoop = OutputLoop()
+
+    scheduler = AnalysisScheduler()
+
+    prefetcher = GotoPrefetcher()
+
+    background = BackgroundAnalyzer()
+
+    usages = UsagesCache()
+
+    symbols = SymbolIndexes()
+
+    # Include graphs of projects, by project root.
+    includeGraphs = {}
+    includeGraphsLock = threading.Lock()
+
+    @staticmethod
+    def includeGraph(view):
+        """ Retrieve include graph of project view belongs to."""
+        root = Cfserver.projectRoot(view)
+        with Cfserver.includeGraphsLock:
+            graph = Cfserver.includeGraphs.get(root)
+            if graph is None:
+                window = view.window() or sublime.active_window()
+                folders = window.folders() if window is not None else []
+                graph = Cfserver.includeGraphs[root] = IncludeGraph(
+                    list(folders) or [root])
+            return graph
+
+    @staticmethod
+    def analyzeIncluders(view):
+        """ Queue analysis of open modules including header in view."""
+
+        """ Modules are queued in order of how directly they include
+            header, after analysis of header itself. Cached errors of
+            modules that are not open and include header are dropped,
+            so that they get analyzed once opened."""
+        header = view.file_name()
+        daemonKey = Cfserver.daemonKey(view)
+        modules = {}  # filename -> view
+        for window in sublime.windows():
+            for other in window.views():
+                filename = other.file_name()
+                if (filename is not None and filename not in modules and
+                        Daemon.moduleCommand(filename) is not None and
+                        is_supported_language(other) and
+                        Cfserver.daemonKey(other) == daemonKey):
+                    modules[filename] = other
+        cached = [filename for filename in Cfserver.diagnostics.filenames()
+                  if filename not in modules and
+                  Daemon.moduleCommand(filename) is not None]
+        with Cfserver.stats.timed("include scan", header):
+            includers = Cfserver.includeGraph(view).includers(
+                header, sorted(modules) + sorted(cached))
+        opened = []
+        for (distance, filename) in includers:
+            if filename in modules:
+                opened.append(modules[filename])
+            else:
+                Cfserver.diagnostics.discard(filename)
+        if not opened:
+            return
+        daemon = Cfserver.getDaemon(view)
+        if not daemon.isFileRegistered(header):
+            # analysis of header will not reload it, modules may use it
+            daemon.sendCommand("reload \"%s\"" % (
+                header.replace("\\", "\\\\")))
+        for other in opened:
+            Cfserver.scheduler.schedule(other, force=True)
+
+    REGION_ERRORS = "cfserver_errors"
+    REGION_WARNINGS = "cfserver_warnings"
+
+    @staticmethod
+    def findOpenFile(filename):
+        """ Find view of file in any window, None if it is not open."""
+        for window in sublime.windows():
+            view = window.find_open_file(filename)
+            if view is not None:
+                return view
+        return None
+
+    @staticmethod
+    def clearErrors(router, lines):
+        """ Handle ERRORS-CLEAR Cfserver response."""
+        # Cfserver does not always say what file errors are being cleared
+        # for. If it does not, it is the file being analyzed by daemon
+        # whose replies router correlates; that need not be file in any
+        # view, as background and batch analyses share daemons.
+        fields = ResponseParser.splitFields(lines[0])
+        if len(fields) > 1:
+            filename = Cfserver.originalFilename(fields[1])
+        else:
+            keys = router.pendingKeys("analyze")
+            if len(keys) != 1:
+                return
+            filename = keys[0][1]
+        view = Cfserver.findOpenFile(filename)
+        if view is not None:
+            ErrorsHandler.erase(view)
+        Cfserver.diagnostics.discard(filename)
+
+    @staticmethod
+    def fileContent(filename):
+        """ Read file as Sublime would show it, None if it can't be read."""
+
+        """ Returns (text, contentKey), contentKey being the one
+            DiagnosticsCache.contentKey gives once file is opened
+            unchanged."""
+        try:
+            with open(filename, "rb") as f:
+                text = f.read().decode("utf-8", "replace")
+        except OSError:
+            return None
+        text = text.replace("\r\n", "\n")
+        return (text, zlib.crc32(text.encode("utf-8")))
+
+    @staticmethod
+    def fileErrors(filename):
+        """ Retrieve cached errors of file as it is on disk, if any."""
+        content = Cfserver.fileContent(filename)
+        if content is None:
+            return None
+        return Cfserver.diagnostics.get(filename, content[1])
+
+    @staticmethod
+    def storeFileErrors(filename, lines):
+        """ Put errors reported for file that is not open into cache."""
+        result = Cfserver.readFileErrors(filename, lines)
+        if result is not None:
+            (errors, text, contentKey) = result
+            Cfserver.diagnostics.put(filename, contentKey, errors)
+
+    @staticmethod
+    def readFileErrors(filename, lines):
+        """ Parse errors reported for file as it is on disk."""
+
+        """ Returns (errors, text of file, content key), None if reply
+            is malformed or file can't be read."""
+        parser = ErrorsParser()
+        with Cfserver.stats.timed("ERRORS parse", lines[0]):
+            if not parser.parse(lines):
+                return None
+        content = Cfserver.fileContent(filename)
+        if content is None:
+            return None
+        (text, contentKey) = content
+        index = OffsetIndex(text)
+        records = parser.records
+        if not index.isIdentity:
+            records = [r._replace(fromOfs=index.charOffset(r.fromOfs),
+                                  toOfs=index.charOffset(r.toOfs))
+                       for r in records]
+        return (ErrorsInFile(records), text, contentKey)
+
+    @staticmethod
+    def redrawFromCache(view):
+        """ Show cached errors if view content did not change since."""
+        errors = Cfserver.diagnostics.get(
+            view.file_name(), DiagnosticsCache.contentKey(view))
+        if errors is None:
+            return False
+        ErrorsHandler.render(view, errors)
+        Cfserver.scheduler.markAnalyzed(view)
+        return True
+
+
+class ErrorsHandler(Handler):
+
+    """ Handler for ERRORS Cfserver response."""
+
+    def __init__(self):
+        """ Initialize handler."""
+        super().__init__("ERRORS", self.proc)
+
+    mark_error_png = None
+
+    @staticmethod
+    def getMarkErrorPng():
+        """ Retrieve png for error mark."""
+        if ErrorsHandler.mark_error_png is None:
+            ErrorsHandler.mark_error_png = sublime.find_resources(
+                "cfserver-mark-error.png")[0]
+        return ErrorsHandler.mark_error_png
+
+    mark_warning_png = None
+
+    @staticmethod
+    def getMarkWarningPng():
+        """ Retrieve png for warning mark."""
+
+        if ErrorsHandler.mark_warning_png is None:
+            ErrorsHandler.mark_warning_png = sublime.find_resources(
+                "cfserver-mark-warning.png")[0]
+        return ErrorsHandler.mark_warning_png
+
+    def proc(self, lines):
+        """ Parse and process errors reported by Cfserver."""
+
+        """ Errors nobody asked for are only shown: which text they
+            were reported for is not known, so they are not cached."""
+        parser = ErrorsParser()
+        with Cfserver.stats.timed("ERRORS parse", lines[0]):
+            isComplete = parser.parse(lines)
+        if isComplete:
+            (errorsFilename, errorsId) = parser.header
+            view = Cfserver.findOpenFile(errorsFilename)
+            if view:  # file is still around
+                errors = ErrorsInFile(
+                    Cfserver.charRecords(view, parser.records))
+                with Cfserver.stats.timed("ERRORS render", lines[0]):
+                    ErrorsHandler.render(view, errors)
+
+    # Regions are split by position into buckets of this many characters,
+    # each drawn under its own key, so that unchanged ones are left alone.
+    BUCKET = 32768
+
+    # Number of buckets drawn at once on async thread.
+    CHUNK = 8
+
+    # view id -> (change count, {key: spans drawn}, generation)
+    rendered = {}
+    renderLock = threading.Lock()
+
+    @staticmethod
+    def render(view, errors):
+        """ Show errors and warnings in view."""
+
+        """ Buckets that changed since last time are drawn, ones around
+            visible part of view right away, the rest in chunks on async
+            thread. At most max_regions regions are drawn, errors first
+            and ones closer to visible part next."""
+        records = errors.currentRecords()
+        countErrors = sum(1 for r in records if r.type == "ERROR")
+        countWarnings = len(records) - countErrors
+        visible = view.visible_region()
+        cap = Cfserver.get_setting("max_regions", 10000, view)
+        if cap and len(records) > cap:
+            center = (visible.begin() + visible.end()) // 2
+            records = sorted(records, key=lambda r: (
+                r.type != "ERROR", abs(r.fromOfs - center)))[:cap]
+
+        buckets = {}  # key -> spans
+        for (error_type, fromOfs, toOfs, message) in records:
+            key = "%s-%d" % (
+                Cfserver.REGION_ERRORS if error_type == "ERROR" else
+                Cfserver.REGION_WARNINGS, fromOfs // ErrorsHandler.BUCKET)
+            spans = buckets.get(key)
+            if spans is None:
+                spans = buckets[key] = []
+            spans.append((fromOfs, toOfs))
+
+        with ErrorsHandler.renderLock:
+            (changeCount, drawn, generation) = ErrorsHandler.rendered.get(
+                view.id(), (None, {}, 0))
+            if changeCount != view.change_count():
+                # Sublime moved regions as text changed, redraw them all.
+                drawn = dict.fromkeys(drawn)
+            stale = [key for key in drawn if key not in buckets]
+            for key in stale:
+                del drawn[key]
+            changed = [key for key in buckets if drawn.get(key) != buckets[key]]
+            ErrorsHandler.rendered[view.id()] = (
+                view.change_count(), drawn, generation + 1)
+        for key in stale:
+            view.erase_regions(key)
+
+        first = visible.begin() // ErrorsHandler.BUCKET - 1
+        last = visible.end() // ErrorsHandler.BUCKET + 1
+        urgent = []
+        deferred = []
+        for key in changed:
+            bucket = int(key.rsplit("-", 1)[1])
+            (urgent if first <= bucket <= last else deferred).append(key)
+        ErrorsHandler.draw(view, generation + 1, urgent, buckets)
+        if deferred:
+            sublime.set_timeout_async(lambda: ErrorsHandler.drawChunks(
+                view, generation + 1, deferred, buckets), 0)
+
+        summary = "Cfserver: %d errors, %d warnings" % (
+            countErrors, countWarnings)
+        if len(records) < countErrors + countWarnings:
+            summary += ", %d shown" % (len(records))
+        view.set_status("cfserver_summary", summary)
+
+    @staticmethod
+    def draw(view, generation, keys, buckets):
+        """ Draw buckets, unless view was rendered again since."""
+        for key in keys:
+            with ErrorsHandler.renderLock:
+                entry = ErrorsHandler.rendered.get(view.id())
+                if entry is None or entry[2] != generation:
+                    return False
+                entry[1][key] = buckets[key]
+            regions = [sublime.Region(a, b) for (a, b) in buckets[key]]
+            if key.startswith(Cfserver.REGION_ERRORS):
+                view.add_regions(key, regions, "invalid.deprecated",
+                                 ErrorsHandler.getMarkErrorPng(),
+                                 sublime.DRAW_NO_FILL)
+            else:
+                view.add_regions(key, regions, "invalid",
+                                 ErrorsHandler.getMarkWarningPng(),
+                                 sublime.DRAW_NO_FILL)
+        return True
+
+    @staticmethod
+    def drawChunks(view, generation, keys, buckets):
+        """ Draw next chunk of buckets, schedule the rest."""
+        chunk = keys[:ErrorsHandler.CHUNK]
+        rest = keys[ErrorsHandler.CHUNK:]
+        if ErrorsHandler.draw(view, generation, chunk, buckets) and rest:
+            sublime.set_timeout_async(lambda: ErrorsHandler.drawChunks(
+                view, generation, rest, buckets), 0)
+
+    @staticmethod
+    def erase(view):
+        """ Remove all errors and warnings from view."""
+        with ErrorsHandler.renderLock:
+            entry = ErrorsHandler.rendered.pop(view.id(), None)
+        if entry is not None:
+            for key in entry[1]:
+                view.erase_regions(key)
+        view.erase_status("cfserver_summary")
+
+
+class CfserverEventListener(sublime_plugin.EventListener):
+
+    """ Plugin event listener."""
+
+    def on_activated(self, view):
+        """ Handle on_activated event."""
+        filename = view.file_name()
+        with Cfserver.stats.timed("on_activated", filename):
+            if is_supported_language(view) and filename is not None:
+                Cfserver.edits.track(view)
+
+    def on_activated_async(self, view):
+        """ Handle on_activated_async event."""
+
+        """ Cached errors are looked up here, as hashing text of view
+            is too slow for UI thread."""
+        with Cfserver.stats.timed("on_activated_async", view.file_name()):
+            if is_supported_language(view) and view.file_name() is not None:
+                # Cfserver.selectModule(view.file_name())
+                if Cfserver.background.isEnabled(view):
+                    Cfserver.background.start(view)
+                if (not Cfserver.scheduler.isAnalyzed(view) and
+                        not Cfserver.redrawFromCache(view)):
+                    Cfserver.scheduler.schedule(view)
+
+    def on_load_async(self, view):
+        """ Handle on_load_async event."""
+        with Cfserver.stats.timed("on_load_async", view.file_name()):
+            if is_supported_language(view) and view.file_name() is not None:
+                # Cfserver.selectModule(view.file_name())
+                if not Cfserver.redrawFromCache(view):
+                    Cfserver.scheduler.schedule(view, force=True)
+
+    def on_modified(self, view):
+        """ Handle on_modified event."""
+
+        """ Runs on UI thread, so that selection is still the one edit
+            was made with. Cached errors follow the edit."""
+        filename = view.file_name()
+        Cfserver.background.touch()
+        with Cfserver.stats.timed("on_modified", filename):
+            if is_supported_language(view) and filename is not None:
+                edit = Cfserver.edits.edit(view)
+                errors = Cfserver.diagnostics.peek(filename)
+                if errors is None:
+                    pass
+                elif edit is None:  # view was not tracked
+                    Cfserver.diagnostics.discard(filename)
+                else:
+                    errors.edit(*edit)
+
+    def on_selection_modified(self, view):
+        """ Handle on_selection_modified event."""
+        Cfserver.background.touch()
+        with Cfserver.stats.timed("on_selection_modified", view.file_name()):
+            if is_supported_language(view):
+                Cfserver.edits.track(view)
+
+    def on_modified_async(self, view):
+        """ Handle on_modified_async event."""
+        with Cfserver.stats.timed("on_modified_async", view.file_name()):
+            if (is_supported_language(view) and view.file_name() is not None
+                    and Cfserver.get_setting("analyze_unsaved", False, view)):
+                Cfserver.scheduler.schedule(view, delay=Cfserver.get_setting(
+                    "unsaved_analysis_delay", 1000, view))
+
+    def on_close(self, view):
+        """ Handle on_close event."""
+        Cfserver.edits.forget(view)
+        DiagnosticsCache.forgetView(view)
+        with ErrorsHandler.renderLock:
+            ErrorsHandler.rendered.pop(view.id(), None)
+
+    def on_post_save_async(self, view):
+        """ Handle on_post_save_async event."""
+        if view.file_name() is not None:
+            Cfserver.usages.invalidate(Cfserver.daemonKey(view))
+            if is_supported_language(view):
+                Cfserver.symbols.fileChanged(view)
+        with Cfserver.stats.timed("on_post_save_async", view.file_name()):
+            if is_supported_language(view) and view.file_name() is not None:
+                # Cfserver.selectModule(view.file_name())
+                Cfserver.scheduler.schedule(view, force=True)
+                Cfserver.includeGraph(view).fileChanged(view.file_name())
+                if is_header(view.file_name()):
+                    Cfserver.analyzeIncluders(view)
+
+    def on_query_completions(self, view, prefix, locations):
+        """ Handle on_query_completions event."""
+        return []
+        if is_supported_language(view) and view.file_name is not None:
+            print("on_query_completions: in %s with %s at %s " %
+                  (view, prefix, locations))
+            return [("Try this " + prefix, "sugs")]
+
+    def on_selection_modified_async(self, view):
+        """Handle selection changes (cursor moves or text selected)."""
+        filename = view.file_name()
+        with Cfserver.stats.timed("on_selection_modified_async", filename):
+            if is_supported_language(view) and filename is not None:
+                Cfserver.prefetcher.caretMoved(view)
+                errors = Cfserver.diagnostics.peek(filename)
+                if errors is not None:
+                    messages = errors.messagesAt(view.sel()[0].a)
+                    if messages:
+                        view.set_status(
+                            "cfserver_errors", ",".join(messages))
+                        return
+            view.erase_status("cfserver_errors")
+
+
+def plugin_loaded():
+    """ Apply settings that are read once."""
+    Cfserver.diagnostics.setBudget(Cfserver.get_setting(
+        "diagnostics_cache_size", DiagnosticsCache.DEFAULT_BUDGET))
+    set_timeout_async(Cfserver.sweepShadows, 0)
+
+
+def plugin_unloaded():
+    """ Stop every Cfserver, so reloaded plugin starts afresh."""
+    Cfserver.background.stopAll()
+    if CfserverCheckProject.batch is not None:
+        CfserverCheckProject.batch.cancel()
+    Cfserver.daemons.stopAll()
+    Cfserver.removeShadows()
+
+
+# C/C++ files that are included rather than analyzed as modules.
+HEADER_EXTENSIONS = (".h", ".hh", ".hpp", ".hxx", ".inl")
+
+
+def is_header(filename):
+    """ Confirm whether file is C/C++ header."""
+    return filename.endswith(HEADER_EXTENSIONS)
+
+
+def is_supported_language(view):
+    """ Confirm whether view hosts source C/C++ code."""
+    if view.is_scratch() or view.file_name() is None:
+        return False
+    caret = view.sel()[0].a
+    return (view.score_selector(caret, "source.c++ ") +
+            view.score_selector(caret, "source.c ")) > 0
+
+
+class CfserverFind(sublime_plugin.TextCommand):
+
+    """ Navigation command."""
+
+    def set_find_command(self, find_command):
+        self.find_command = find_command
+
+    def is_enabled(self):
+        return is_supported_language(sublime.active_window().active_view())
+
+    def is_visible(self):
+        return is_supported_language(sublime.active_window().active_view())
+
+    """ Support navigation to definitions."""
+
+    def run(self, edit):
+        """ Send find command request to Cfserver."""
+        self.send(Cfserver.getDaemon(self.view), self.handler())
+
+    def send(self, daemon, handler):
+        """ Send find command, have its reply processed by handler."""
+        Cfserver.prefetcher.cancel()
+        request = daemon.request(
+            self.command(), handler.type, handler.proc,
+            key=CfserverFind.REQUEST_KEY,
+            timeout=Cfserver.requestTimeout())
+        request.addDoneCallback(CfserverFind.reportTimeout)
+        Cfserver.scheduler.schedule(self.view)
+
+    # Navigation requests supersede one another, only latest one counts.
+    REQUEST_KEY = "navigation"
+
+    @staticmethod
+    def reportTimeout(request):
+        """ Let user know Cfserver did not answer in time."""
+        if request.state == Request.TIMED_OUT:
+            sublime.status_message("Cfserver: request timed out")
+
+class CfserverContextFind(CfserverFind):
+    def handler(self, cacheKey=None):
+        return UsagesHandler(cacheKey)
+
+    def run(self, edit):
+        """ Show remembered results of same find, send find otherwise."""
+        view = self.view
+        daemon = Cfserver.getDaemon(view)
+        identifier = GotoPrefetcher.identifierKey(view)
+        if identifier is None:
+            return super().run(edit)
+        cacheKey = Cfserver.usages.key(
+            self.find_command, Cfserver.daemonKey(view), identifier)
+        hits = Cfserver.usages.get(cacheKey)
+        if hits is not None:
+            UsagesHandler.show(hits)
+            Cfserver.scheduler.schedule(view)
+        else:
+            self.send(daemon, self.handler(cacheKey))
+
+    def command(self):
+        return CfserverContextFind.findCommand(self.find_command, self.view)
+
+    @staticmethod
+    def findCommand(find_command, view):
+        """ Build find command for identifier at caret."""
+        offset = Cfserver.offsetIndex(view).byteOffset(view.sel()[0].a)
+
+        return "%s \"%s\" %d" % (
+                find_command,
+                view.file_name().replace("\\", "\\\\"),
+                offset)
+
+
+class UsagesHandler(Handler):
+
+    """ Handler for USAGES Cfserver response."""
+
+    def __init__(self, cacheKey=None):
+        """ Initialize handler, hits go to usages cache under cacheKey."""
+        super().__init__("USAGES", self.proc)
+        self.cacheKey = cacheKey
+
+    # Positions of filename, fromOfs, toOfs and quote among fields of
+    # usage record and minimal number of fields in well-formed record.
+    usageLayout = (0, 1, 2, 3)
+    usageFieldCount = 5
+    hasArgument = False
+
+    def parser(self):
+        """ Create parser for USAGES response."""
+        return UsagesParser(
+            self.usageLayout, self.usageFieldCount, self.hasArgument)
+
+    # Index hits go to, if any, and whether they are shown to user.
+    index = None
+    isShown = True
+
+    def proc(self, lines):
+        """ Parse and process usages reported by Cfserver."""
+        hits = self.hits(lines)
+        if hits is None:
+            return
+
+        if self.cacheKey is not None:
+            Cfserver.usages.put(self.cacheKey, hits)
+        if self.index is not None:
+            self.index.replaceAll(hits)
+        if self.isShown:
+            UsagesHandler.show(hits)
+
+    def hits(self, lines):
+        """ Parse usages into list of hits, None if reply is malformed."""
+        parser = self.parser()
+        if not parser.parse(lines):
+            return None
+
+        hits = []
+        seen = set()
+        decodeQuote = UsagesHandler.decodeQuote
+        originalFilename = Cfserver.originalFilename
+        for (matchtype, filename, fromOfs, toOfs, quote) in parser.records:
+            hit = (matchtype, originalFilename(filename),
+                   fromOfs, toOfs, decodeQuote(quote))
+            if hit not in seen:  # both file and its shadow may match
+                seen.add(hit)
+                hits.append(hit)
+        return hits
+
+    @staticmethod
+    def decodeQuote(quote):
+        """ Decode escape sequences in quote, if it has any."""
+        if "\\" in quote:
+            quote = quote.encode("latin-1", "backslashreplace").decode(
+                "unicode_escape")
+        return quote.strip()
+
+    @staticmethod
+    def show(hits):
+        """ Let user pick hit to navigate to, go there if it is the only one."""
+        if len(hits) > 1:
+            sublime.active_window().show_quick_panel(
+                ["%s: %s" % (h[0], h[4]) for h in hits],
+                lambda index: UsagesHandler.selectHit(
+                    hits[index] if index != -1 else None))
+        elif len(hits) == 1:
+            UsagesHandler.selectHit(hits[0])
+
+    @staticmethod
+    def selectHit(hit):
+        if hit:
+            (matchtype, filename, fromOfs, toOfs, quote) = hit
+            view = sublime.active_window().open_file(filename)
+            if view.is_loading():
+                threading.Thread(
+                    target=UsagesHandler.navigate_to_location_once_loaded,
+                    args=(view, hit)).start()
+            else:
+                UsagesHandler.select(view, fromOfs, toOfs)
+
+    @staticmethod
+    def select(view, fromOfs, toOfs):
+        """ Select text between Cfserver byte offsets and scroll to it."""
+        index = Cfserver.offsetIndex(view)
+        view.sel().clear()
+        view.sel().add(sublime.Region(
+            index.charOffset(fromOfs), index.charOffset(toOfs)))
+        view.show_at_center(view.sel()[0])
+
+    @staticmethod
+    def navigate_to_location_once_loaded(view, hit):
+        while view.is_loading():
+            time.sleep(1)  # sleep for 1 sec
+        (matchtype, filename, fromOfs, toOfs, quote) = hit
+        UsagesHandler.select(view, fromOfs, toOfs)
+
+
+class CfserverGotoDef(CfserverContextFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("goto-def")
+
+    def run(self, edit):
+        """ Use prefetched goto-def if there is one."""
+        (lines, request) = Cfserver.prefetcher.take(self.view)
+        if lines is not None:
+            self.handler().proc(lines)
+            Cfserver.scheduler.schedule(self.view)
+        elif request is not None:
+            handler = self.handler()
+            request.addDoneCallback(
+                lambda request: handler.proc(request.reply)
+                if request.state == Request.DONE
+                else CfserverFind.reportTimeout(request))
+        else:
+            super().run(edit)
+
+
+class CfserverFindUsages(CfserverContextFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-usages")
+
+
+class CfserverFindDecls(CfserverContextFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-declarators")
+
+
+class CfserverFindParents(CfserverContextFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-parents")
+
+
+class CfserverFindInheritors(CfserverContextFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-inheritors")
+
+
+class UsagesNamesHandler(UsagesHandler):
+
+    """ Handler for USAGES NAMES Cfserver response."""
+
+    usageLayout = (0, 3, 4, 5)
+    usageFieldCount = 6
+    hasArgument = True
+
+
+class CfserverGlobalFind(CfserverFind):
+
+    def handler(self):
+        return UsagesNamesHandler()
+
+    def run(self, edit):
+        """ Show what symbol index has, ask Cfserver if it has nothing."""
+
+        """ Index saved in previous session is loaded on async thread,
+            and refreshed in the background if project changed since."""
+        sublime.set_timeout_async(self.runFromIndex, 0)
+
+    def runFromIndex(self):
+        """ Show symbol index, refresh or build it."""
+        view = self.view
+        daemon = Cfserver.getDaemon(view)
+        index = Cfserver.symbols.get(
+            Cfserver.daemonKey(view), self.find_command)
+        handler = self.handler()
+        handler.index = index
+        if not index.isComplete:
+            self.send(daemon, handler)
+            return
+        UsagesHandler.show(index.hits())
+        if index.takeStale():
+            handler.isShown = False
+            daemon.request(self.command(), handler.type, handler.proc,
+                           key=("symbols", self.find_command),
+                           timeout=Cfserver.requestTimeout())
+
+    def command(self):
+        return "%s \"%s\" \"%s\"" % (self.find_command, "", "system")
+
+
+class CfserverFindNames(CfserverGlobalFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-names")
+
+
+class CfserverFindNamesInFile(CfserverFind):
+
+    def handler(self):
+        return UsagesNamesHandler()
+
+    def command(self):
+        view = self.view
+
+        return "%s \"%s\" \"\"" % (
+                self.find_command,
+                view.file_name().replace("\\", "\\\\"))
+
+        return "%s \"%s\" \"%s\"" % (self.find_command, "", "system")
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-names-in-file")
+
+
+class CfserverFindMacros(CfserverGlobalFind):
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-macros")
+
+
+class UsagesFileNamesHandler(UsagesNamesHandler):
+
+    """ Handler for USAGES filenames Cfserver response."""
+
+    usageLayout = (0, 1, 2, 7)
+    usageFieldCount = 11
+
+
+class CfserverFindFiles(CfserverGlobalFind):
+
+    def handler(self):
+        return UsagesFileNamesHandler()
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-files")
+
+
+class UsagesStringsNamesHandler(UsagesNamesHandler):
+
+    """ Handler for USAGES strings Cfserver response."""
+
+    usageLayout = (0, 1, 2, 3)
+    usageFieldCount = 11
+
+
+class CfserverFindStrings(CfserverGlobalFind):
+
+    def handler(self):
+        return UsagesStringsNamesHandler()
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.set_find_command("find-strings")
+
+
+class CfserverCheckProject(sublime_plugin.WindowCommand):
+
+    """ Analyze every C/C++ source of project with several Cfservers."""
+
+    # Batch analysis in progress, if any.
+    batch = None
+
+    def run(self, cancel=False, shards=None):
+        """ Start batch analysis, or cancel the one in progress."""
+        previous = CfserverCheckProject.batch
+        CfserverCheckProject.batch = None
+        if previous is not None:
+            previous.cancel()
+        if cancel:
+            return
+        view = self.window.active_view()
+        key = Cfserver.daemonKey(view)
+        folders = self.window.folders() or [key[0]]
+        if shards is None:
+            shards = Cfserver.get_setting("check_project_shards", 0, view)
+        if not shards:
+            shards = multiprocessing.cpu_count()
+        batch = CfserverCheckProject.batch = BatchAnalysis(
+            folders, shards, key, PanelOutput(self.window),
+            Cfserver.requestTimeout())
+        sublime.set_timeout_async(batch.start, 0)
+
+
+class CfserverStats(sublime_plugin.WindowCommand):
+
+    """ Show timing statistics of plugin."""
+
+    PANEL = "cfserver_stats"
+
+    def run(self, dump=False, path=None, reset=False):
+        """ Show stats in output panel, optionally dump them as JSON."""
+        if dump:
+            if path is None:
+                path = os.path.join(tempfile.gettempdir(), "cfserver-stats.json")
+            Cfserver.stats.dump(path)
+            sublime.status_message("Cfserver: statistics written to %s" % (path))
+        panel = self.window.create_output_panel(CfserverStats.PANEL)
+        panel.run_command("append", {"characters": Cfserver.stats.report()})
+        self.window.run_command(
+            "show_panel", {"panel": "output.%s" % (CfserverStats.PANEL)})
+        if reset:
+            Cfserver.stats.reset()
+
+
+def main(argv=None):
+    """ Analyze files given on command line, write their errors."""
+    parser = argparse.ArgumentParser(
+        prog="linter.py",
+        description="Analyze C/C++ files with cfserver.")
+    parser.add_argument(
+        "paths", nargs="+",
+        help="files to analyze, or directories to analyze sources in")
+    parser.add_argument(
+        "--cfserver", default="cfserver.exe", help="path to cfserver")
+    parser.add_argument(
+        "--format", choices=("jsonl", "sarif"), default="jsonl",
+        help="JSON object per line per error, or SARIF 2.1.0 log")
+    parser.add_argument(
+        "--output", help="file to write errors to instead of stdout")
+    parser.add_argument(
+        "--jobs", type=int, default=0,
+        help="number of cfservers run at the same time, 0 for one per CPU")
+    parser.add_argument(
+        "--timeout", type=float, default=30,
+        help="number of seconds to wait for analysis of one file")
+    parser.add_argument(
+        "--quiet", action="store_true",
+        help="write neither progress nor cfserver traffic to stderr")
+    args = parser.parse_args(argv)
+
+    stream = (open(args.output, "w", encoding="utf-8")
+              if args.output else sys.stdout)
+    progressStream = None if args.quiet else sys.stderr
+    # Keep console output of plugin away from errors written to stdout.
+    sys.stdout = open(os.devnull, "w") if args.quiet else sys.stderr
+    output = (SarifOutput if args.format == "sarif" else JsonLinesOutput)(
+        stream, progressStream)
+    key = (os.getcwd(), args.cfserver, None, None)
+    batch = BatchAnalysis([os.path.abspath(path) for path in args.paths],
+                          args.jobs or multiprocessing.cpu_count(),
+                          key, output, args.timeout)
+    try:
+        batch.start()
+        while not batch.finished.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        batch.cancel()
+        return 130
+    finally:
+        if stream is not sys.__stdout__:
+            stream.close()
+    if batch.failure is not None:
+        sys.stderr.write("linter.py: error: %s\n" % (batch.failure))
+        return 2
+    return 1 if batch.counts["errors"] or batch.counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())